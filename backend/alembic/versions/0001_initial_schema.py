@@ -0,0 +1,53 @@
+"""initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+Databases created by the old Base.metadata.create_all() at startup
+already have these tables, so they are only created when missing.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name: str) -> bool:
+    if op.get_context().as_sql:
+        return False
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade() -> None:
+    if not _has_table("users"):
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("name", sa.String(255), nullable=False),
+            sa.Column("email", sa.String(255), nullable=False, unique=True),
+            sa.Column("password", sa.String(), nullable=False),
+            sa.Column("total_donated", sa.Integer(), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("verified", sa.Boolean(), nullable=True),
+        )
+
+    if not _has_table("donations"):
+        op.create_table(
+            "donations",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("amount", sa.Integer(), nullable=False),
+            sa.Column("status", sa.Boolean(), nullable=True),
+            sa.Column("payment_reference", sa.String(), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("donations")
+    op.drop_table("users")
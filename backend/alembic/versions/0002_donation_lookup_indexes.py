@@ -0,0 +1,56 @@
+"""donation lookup indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+
+- payment_reference: unique, it is the lookup key for capture and every
+  PayPal webhook.
+- (user_id, created_at DESC, id DESC): keyset pagination of a user's
+  donations; its leading column also serves every user_id lookup.
+
+On Postgres the indexes are built CONCURRENTLY so a large donations
+table stays writable during the migration.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def _existing_indexes() -> set:
+    if op.get_context().as_sql:
+        return set()
+    inspector = sa.inspect(op.get_bind())
+    return {index["name"] for index in inspector.get_indexes("donations")}
+
+
+def upgrade() -> None:
+    existing = _existing_indexes()
+
+    with op.get_context().autocommit_block():
+        if "ix_donations_payment_reference" not in existing:
+            op.create_index(
+                "ix_donations_payment_reference",
+                "donations",
+                ["payment_reference"],
+                unique=True,
+                postgresql_concurrently=True,
+            )
+
+        if "ix_donations_user_created_id" not in existing:
+            op.create_index(
+                "ix_donations_user_created_id",
+                "donations",
+                ["user_id", sa.text("created_at DESC"), sa.text("id DESC")],
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_donations_user_created_id", table_name="donations", postgresql_concurrently=True)
+        op.drop_index("ix_donations_payment_reference", table_name="donations", postgresql_concurrently=True)
@@ -0,0 +1,29 @@
+"""processed webhook events
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+
+Durable record of handled PayPal webhook event ids; Redis holds the hot
+copy, this table survives Redis restarts and evictions.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "processed_webhook_events",
+        sa.Column("event_id", sa.String(64), primary_key=True),
+        sa.Column("event_type", sa.String(64), nullable=True),
+        sa.Column("processed_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("processed_webhook_events")
@@ -0,0 +1,40 @@
+"""webhook inbox
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+
+Raw webhook deliveries are stored here and acknowledged immediately;
+the webhook pipeline workers verify and apply them afterwards.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "webhook_inbox",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("event_id", sa.String(64), nullable=True, unique=True),
+        sa.Column("event_type", sa.String(64), nullable=True),
+        sa.Column("order_key", sa.String(64), nullable=False),
+        sa.Column("headers", sa.Text(), nullable=False),
+        sa.Column("body", sa.Text(), nullable=False),
+        sa.Column("status", sa.String(16), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("received_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("claimed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("processed_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_webhook_inbox_status", "webhook_inbox", ["status"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_webhook_inbox_status", table_name="webhook_inbox")
+    op.drop_table("webhook_inbox")
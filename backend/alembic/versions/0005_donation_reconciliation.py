@@ -0,0 +1,33 @@
+"""donation reconciliation
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+
+Pending donations whose PayPal order was abandoned are marked with
+expired_at by the reconciliation job, which records how far it got in
+job_checkpoints so an interrupted sweep resumes where it stopped.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("donations", sa.Column("expired_at", sa.DateTime(timezone=True), nullable=True))
+    op.create_table(
+        "job_checkpoints",
+        sa.Column("name", sa.String(64), primary_key=True),
+        sa.Column("position", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("job_checkpoints")
+    with op.batch_alter_table("donations") as batch:
+        batch.drop_column("expired_at")
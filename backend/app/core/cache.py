@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "givehub:invalidate"
+
+
+class TTLCache:
+    """Bounded in-process LRU cache whose entries expire after ``ttl`` seconds"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class InvalidationBus:
+    """
+    Cross-worker cache invalidation over Redis pub/sub.
+
+    Messages look like ``<prefix>:<key>``; every worker runs a listener
+    that dispatches them to the handler registered for ``prefix`` so
+    in-process caches drop entries changed by another worker.
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, Callable[[str], None]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, prefix: str, handler: Callable[[str], None]) -> None:
+        self._handlers[prefix] = handler
+
+    async def publish(self, prefix: str, key: Any) -> None:
+        from .redis import get_redis
+
+        try:
+            await get_redis().publish(INVALIDATION_CHANNEL, f"{prefix}:{key}")
+        except Exception as e:
+            logger.warning(f"Failed to publish cache invalidation {prefix}:{key}: {e}")
+
+    def dispatch(self, message: str) -> None:
+        prefix, _, key = message.partition(":")
+        handler = self._handlers.get(prefix)
+        if handler is not None:
+            handler(key)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen(), name="cache-invalidation")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _listen(self) -> None:
+        from .redis import get_redis
+
+        while True:
+            try:
+                async with get_redis().pubsub() as pubsub:
+                    await pubsub.subscribe(INVALIDATION_CHANNEL)
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self.dispatch(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Cache invalidation listener lost Redis ({e}), retrying")
+                await asyncio.sleep(1)
+
+
+invalidation_bus = InvalidationBus()
@@ -1,7 +1,19 @@
+from functools import lru_cache
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     database_url: str
+    # Defaults to database_url with its asyncio driver (asyncpg / aiosqlite)
+    async_database_url: str | None = None
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    # Connections opened (and Redis/PayPal reached) during startup, before the first request
+    startup_warm: bool = True
+    db_warm_connections: int = 2
     secret_key: str
     algorithm: str
     access_token_expire_time: int
@@ -12,17 +24,144 @@ class Settings(BaseSettings):
     redis_host: str
     redis_port: int
     otp_exp: int
+    otp_max_attempts: int = 5
+    otp_resend_cooldown: int = 60
+    otp_redis_max_connections: int = 20
+    otp_redis_timeout: float = 0.5
     smtp_host: str
     smtp_port: int
     smtp_user: str
     smtp_pass: str
     from_email: str
+    smtp_starttls: bool = True
+    smtp_timeout: float = 30.0
+    smtp_idle_timeout: float = 60.0
+    email_workers: int = 2
+    email_batch_size: int = 20
+    email_queue_size: int = 10000
+    email_max_retries: int = 5
+    email_retry_backoff: float = 2.0
+    email_dead_letter_size: int = 1000
     paypal_webhook_id: str
     frontend_url: str
     redis_user: str
     redis_pass: str
+    redis_max_connections: int = 50
+    redis_socket_timeout: float = 0.25
+
+    # Authenticated-principal cache (L1 per process, L2 in Redis)
+    principal_cache_size: int = 10000
+    principal_cache_ttl: float = 30.0
+    principal_cache_redis_ttl: int = 300
+
+    # /donations/verify polling: PayPal order details cached per worker,
+    # briefly while the order is in progress and longer once it is final
+    order_status_cache_size: int = 10000
+    order_status_ttl: float = 3.0
+    order_status_terminal_ttl: float = 300.0
+
+    # Conditional GETs: per-user version stamps in Redis, body hashing as the fallback
+    etag_version_ttl: int = 604800
+    etag_max_body: int = 1048576
+
+    # Rate limiting: "redis" shares counters across workers, "memory" is per process
+    rate_limit_enabled: bool = True  # off only for load tests
+    rate_limit_backend: str = "redis"
+    rate_limit_strategy: str = "sliding-window-counter"
+    # Password hashing (argon2); changing the cost rehashes users on their next login
+    argon2_time_cost: int = 2
+    argon2_memory_cost: int = 102400
+    argon2_parallelism: int = 8
+    password_hash_executor: str = "thread"  # or "process"
+    password_hash_workers: int = 4
+    password_hash_queue_size: int = 64
+
+    # Pending-donation reconciliation job (python -m app.jobs.reconcile_donations)
+    reconcile_batch_size: int = 500
+    reconcile_concurrency: int = 8
+    reconcile_rate: float = 10.0  # PayPal order lookups per second
+    reconcile_min_age: int = 3600  # leave younger orders to capture and webhooks
+    reconcile_expire_after: int = 259200  # uncaptured orders older than this are abandoned
+
+    # Donation exports: rows fetched from the cursor and encoded per chunk
+    export_batch_size: int = 1000
+
+    # Prometheus /metrics endpoint and the request/DB/Redis/PayPal/SMTP timing behind it
+    metrics_enabled: bool = True
+
+    # Per-request query profiler (counts, DB time, N+1 and slow statements at /admin/profiler)
+    query_profiler_enabled: bool = False
+    query_profiler_headers: bool = False  # X-DB-* response headers; debug only
+    query_profiler_n_plus_one: int = 5  # same statement this many times with different params
+    query_profiler_buffer_size: int = 200
+    slow_query_threshold: float = 0.1
+    slow_query_explain: bool = False
+
+    # Shared secret for the /admin endpoints (X-Admin-Token header); unset disables them
+    admin_token: str | None = None
+
+    # PayPal HTTP client
+    paypal_http2: bool = True
+    paypal_max_connections: int = 100
+    paypal_max_keepalive_connections: int = 20
+    paypal_keepalive_expiry: float = 30.0
+    paypal_connect_timeout: float = 5.0
+    paypal_timeout: float = 30.0
+    paypal_token_refresh_margin: int = 60
+    # PayPal resilience: adaptive (AIMD) in-flight limit, circuit breaker,
+    # per-operation deadlines and hedged order lookups
+    paypal_limit_initial: int = 20
+    paypal_limit_min: int = 2
+    paypal_limit_max: int = 100
+    # a call counts as slow (and lowers the limit) past this fraction of its deadline
+    paypal_latency_target_ratio: float = 0.4
+    paypal_breaker_failure_rate: float = 0.5
+    paypal_breaker_min_calls: int = 20
+    paypal_breaker_window: float = 30.0
+    paypal_breaker_reset_timeout: float = 15.0
+    paypal_breaker_half_open_calls: int = 3
+    paypal_timeout_token: float = 10.0
+    paypal_timeout_create: float = 10.0
+    paypal_timeout_capture: float = 20.0
+    paypal_timeout_details: float = 5.0
+    paypal_timeout_verify: float = 10.0
+    paypal_hedge_delay: float = 0.5
+
+    # Webhook signature verification: "local" (cached cert, in-process) or "remote"
+    paypal_webhook_verify_mode: str = "local"
+    paypal_cert_allowed_hosts: list[str] = [
+        "api.paypal.com",
+        "api-m.paypal.com",
+        "api.sandbox.paypal.com",
+        "api-m.sandbox.paypal.com",
+    ]
+    paypal_cert_cache_size: int = 16
+    paypal_cert_cache_ttl: int = 6 * 60 * 60
+    # Webhook dedup: how long a processed event id is remembered in Redis,
+    # and how long an in-flight claim blocks other deliveries of the same event
+    webhook_dedup_ttl: int = 7 * 24 * 60 * 60
+    webhook_claim_ttl: int = 120
+    # Webhook pipeline: workers applying stored deliveries, and the queue depth
+    # beyond which new deliveries get a 503 so PayPal retries them later
+    webhook_workers: int = 4
+    webhook_queue_max: int = 1000
+    webhook_max_attempts: int = 5
+    webhook_retry_backoff: float = 2.0
+    webhook_stale_claim: int = 300
 
     class Config:
         env_file = ".env"
 
-settings = Settings()
+@lru_cache
+def get_settings() -> Settings:
+    return Settings()
+
+
+class LazySettings:
+    """Stand-in for the Settings instance: the environment is read on first attribute access, not at import"""
+
+    def __getattr__(self, name):
+        return getattr(get_settings(), name)
+
+
+settings = LazySettings()
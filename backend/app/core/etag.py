@@ -0,0 +1,160 @@
+import hashlib
+import logging
+import time
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Request, Response, status
+
+from .config import settings
+from .principal_cache import Principal
+from .redis import get_redis
+from .security import get_current_user
+
+logger = logging.getLogger(__name__)
+
+CACHE_CONTROL = "private, no-cache"
+
+
+class UserVersions:
+    """
+    Per-user version stamps for conditional GETs.
+
+    ``etag:user:<id>`` changes whenever anything the user can read about
+    themselves changes (a donation is created, settled or refunded, the
+    account is verified). Stamps are nanosecond timestamps rather than a
+    counter, so a flushed or expired key never brings back an old ETag.
+    """
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f"etag:user:{user_id}"
+
+    async def get(self, user_id: int) -> str:
+        redis = get_redis()
+        key = self._key(user_id)
+        version = await redis.get(key)
+        if version is None:
+            await redis.set(key, time.time_ns(), nx=True, ex=settings.etag_version_ttl)
+            version = await redis.get(key)
+        return version
+
+    async def bump(self, user_id: int) -> None:
+        """Call after committing a change that affects the user's reads"""
+        try:
+            await get_redis().set(self._key(user_id), time.time_ns(), ex=settings.etag_version_ttl)
+        except Exception as e:
+            logger.warning(f"Failed to bump ETag version for user {user_id}: {e}")
+
+
+user_versions = UserVersions()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison, as If-None-Match requires"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
+
+
+async def conditional_get(
+    request: Request,
+    response: Response,
+    current_user: Principal = Depends(get_current_user),
+):
+    """
+    Route dependency: answer If-None-Match from the user's version stamp.
+
+    A matching ETag raises a bodiless 304 before the handler runs, so
+    neither the database nor the serializer is touched. Otherwise the
+    ETag is attached to the handler's response. If Redis is unavailable
+    the response is hashed by ETagMiddleware instead.
+    """
+    try:
+        version = await user_versions.get(current_user.id)
+    except Exception as e:
+        logger.warning(f"ETag version unavailable, falling back to body hash: {e}")
+        request.state.etag_hash = True
+        return
+
+    resource = f"{request.url.path}?{request.url.query}|{current_user.id}|{version}"
+    etag = '"' + hashlib.sha256(resource.encode()).hexdigest()[:32] + '"'
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        raise HTTPException(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={"ETag": etag, "Cache-Control": CACHE_CONTROL}
+        )
+
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+
+
+class ETagMiddleware:
+    """
+    Content-hash ETags for GETs that ask for them (``request.state.etag_hash``).
+
+    The body is still produced, but a client that already has it gets a
+    304 instead of the payload. Bodies over ``etag_max_body`` are passed
+    through untouched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        scope.setdefault("state", {})
+        start = None
+        chunks = []
+        size = 0
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, size, passthrough
+
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                wants_hash = scope["state"].get("etag_hash")
+                has_etag = any(name == b"etag" for name, _ in message.get("headers", []))
+                if message["status"] != 200 or not wants_hash or has_etag:
+                    passthrough = True
+                    await send(message)
+                    return
+                start = message
+                return
+
+            chunks.append(message.get("body", b""))
+            size += len(chunks[-1])
+            if size > settings.etag_max_body:
+                passthrough = True
+                await send(start)
+                await send({"type": "http.response.body", "body": b"".join(chunks), "more_body": message.get("more_body", False)})
+                return
+            if message.get("more_body"):
+                return
+
+            body = b"".join(chunks)
+            etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+            headers = [(k, v) for k, v in start["headers"] if k not in (b"content-length", b"etag", b"cache-control")]
+            headers += [(b"etag", etag.encode()), (b"cache-control", CACHE_CONTROL.encode())]
+
+            request_headers = dict(scope["headers"])
+            if etag_matches(request_headers.get(b"if-none-match", b"").decode("latin-1"), etag):
+                await send({"type": "http.response.start", "status": 304, "headers": headers})
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+            headers.append((b"content-length", str(len(body)).encode()))
+            await send({**start, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,75 @@
+import asyncio
+import logging
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+from fastapi import HTTPException, status
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class HashingExecutor:
+    """
+    Dedicated pool for argon2 work.
+
+    Password hashing is CPU/memory heavy, so it gets its own executor
+    instead of the event loop or the default threadpool shared with sync
+    routes. At most ``password_hash_workers`` hashes run at once; up to
+    ``password_hash_queue_size`` more may wait, beyond that callers get a
+    503 instead of piling up.
+    """
+
+    def __init__(self):
+        self._executor: Optional[Executor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._pending = 0
+
+    def start(self) -> None:
+        if self._executor is not None:
+            return
+        if settings.password_hash_executor == "process":
+            self._executor = ProcessPoolExecutor(max_workers=settings.password_hash_workers)
+        else:
+            self._executor = ThreadPoolExecutor(
+                max_workers=settings.password_hash_workers,
+                thread_name_prefix="password-hash",
+            )
+        self._semaphore = asyncio.Semaphore(settings.password_hash_workers)
+
+    def stop(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+            self._semaphore = None
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def run(self, fn: Callable[..., T], *args) -> T:
+        if self._executor is None:
+            self.start()
+
+        limit = settings.password_hash_workers + settings.password_hash_queue_size
+        if self._pending >= limit:
+            logger.warning("Password hashing queue is full, rejecting request")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please try again shortly",
+                headers={"Retry-After": "1"},
+            )
+
+        self._pending += 1
+        try:
+            async with self._semaphore:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self._pending -= 1
+
+
+hashing_executor = HashingExecutor()
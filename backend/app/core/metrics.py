@@ -0,0 +1,234 @@
+import asyncio
+import bisect
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# seconds; covers sub-millisecond cache hits up to slow PayPal calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in self._values.items():
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Gauge:
+    """A gauge that is either set directly or read from ``callback`` at scrape time"""
+
+    def __init__(self, name: str, help: str, callback: Optional[Callable[[], float]] = None):
+        self.name = name
+        self.help = help
+        self.callback = callback
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def render(self) -> List[str]:
+        value = self.value
+        if self.callback is not None:
+            try:
+                value = self.callback()
+            except Exception as e:
+                logger.debug(f"Gauge {self.name} callback failed: {e}")
+                return []
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {value}"]
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram.
+
+    ``observe`` is a bisect plus three additions under a lock, so it is
+    cheap enough for every request, query and Redis call.
+    """
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        for labels, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List = []
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, callback: Optional[Callable[[], float]] = None) -> Gauge:
+        return self._register(Gauge(name, help, callback))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Everything in the Prometheus text exposition format (0.0.4)"""
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+http_requests = metrics.counter("givehub_http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+http_latency = metrics.histogram("givehub_http_request_duration_seconds", "HTTP request latency by route", ("method", "route"))
+http_in_flight = metrics.gauge("givehub_http_requests_in_flight", "HTTP requests currently being served")
+db_latency = metrics.histogram("givehub_db_query_duration_seconds", "SQL statement latency by statement type", ("operation",))
+redis_latency = metrics.histogram("givehub_redis_command_duration_seconds", "Redis command latency", ("command",))
+paypal_latency = metrics.histogram("givehub_paypal_request_duration_seconds", "PayPal API latency by endpoint and status", ("method", "endpoint", "status"))
+paypal_rejections = metrics.counter("givehub_paypal_rejections_total", "PayPal calls refused without being sent", ("reason",))
+paypal_hedges = metrics.counter("givehub_paypal_hedges_total", "Hedged order lookups: sent after a slow or failed first try, and won", ("event",))
+smtp_latency = metrics.histogram("givehub_smtp_send_duration_seconds", "SMTP send latency by outcome", ("outcome",))
+loop_lag = metrics.histogram(
+    "givehub_event_loop_lag_seconds", "How late the event loop ran a scheduled wakeup",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+
+class MetricsMiddleware:
+    """
+    Per-route request counts and latency.
+
+    Routes are labelled by their template (``/donations/{donation_id}``),
+    never the raw path, so label cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = "500"
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        http_in_flight.value += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_flight.value -= 1
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            http_latency.observe(time.perf_counter() - start, scope["method"], path)
+            http_requests.inc(scope["method"], path, status)
+
+
+def instrument_sqlalchemy(engine) -> None:
+    """Time every statement on ``engine`` (the sync engine behind the async one)"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_start"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement else "UNKNOWN"
+        db_latency.observe(time.perf_counter() - started, operation)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        stack = context.connection.info.get("query_start") if context.connection is not None else None
+        if stack:
+            stack.pop()
+
+
+class LoopLagMonitor:
+    """Samples event-loop lag: how much later than requested a sleep wakes up"""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            loop_lag.observe(max(0.0, loop.time() - expected))
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="loop-lag-monitor")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+loop_lag_monitor = LoopLagMonitor()
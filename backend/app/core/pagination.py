@@ -0,0 +1,22 @@
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+
+from fastapi import HTTPException, status
+
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    """Opaque keyset cursor for a (created_at, id) position"""
+    raw = json.dumps([created_at.isoformat(), id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Invalid cursor")
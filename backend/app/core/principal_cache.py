@@ -0,0 +1,133 @@
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Optional
+
+from .cache import TTLCache, invalidation_bus
+from .config import settings
+from .redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user as seen by request handlers (no password hash)"""
+    id: int
+    name: str
+    email: str
+    verified: bool
+    created_at: Optional[datetime]
+
+    @classmethod
+    def from_user(cls, user) -> "Principal":
+        return cls(
+            id=user.id,
+            name=user.name,
+            email=user.email,
+            verified=bool(user.verified),
+            created_at=user.created_at,
+        )
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        data["created_at"] = self.created_at.isoformat() if self.created_at else None
+        return json.dumps(data)
+
+    @classmethod
+    def from_json(cls, raw: str) -> "Principal":
+        data = json.loads(raw)
+        if data.get("created_at"):
+            data["created_at"] = datetime.fromisoformat(data["created_at"])
+        return cls(**data)
+
+
+class PrincipalCache:
+    """
+    Two-level cache of authenticated principals.
+
+    L1 is a per-process TTL/LRU keyed by user id, plus a token -> user id
+    map so a warm token skips JWT decoding too. L2 is Redis, shared by all
+    workers. ``invalidate`` drops the user from both levels and tells the
+    other workers to drop their L1 copy.
+    """
+
+    def __init__(self):
+        self.users = TTLCache(settings.principal_cache_size, settings.principal_cache_ttl)
+        self.tokens = TTLCache(settings.principal_cache_size, settings.principal_cache_ttl)
+        self.l1_hits = 0
+        self.l2_hits = 0
+        self.misses = 0
+        invalidation_bus.register("principal", lambda key: self.users.pop(int(key)))
+
+    @staticmethod
+    def _redis_key(user_id: int) -> str:
+        return f"principal:{user_id}"
+
+    def user_id_for_token(self, token: str) -> Optional[int]:
+        return self.tokens.get(token)
+
+    def remember_token(self, token: str, user_id: int, expires_at: Optional[float]) -> None:
+        ttl = None
+        if expires_at is not None:
+            ttl = min(settings.principal_cache_ttl, expires_at - time.time())
+            if ttl <= 0:
+                return
+        self.tokens.put(token, user_id, ttl)
+
+    async def get(self, user_id: int) -> Optional[Principal]:
+        principal = self.users.get(user_id)
+        if principal is not None:
+            self.l1_hits += 1
+            return principal
+
+        try:
+            raw = await get_redis().get(self._redis_key(user_id))
+        except Exception as e:
+            logger.warning(f"Principal cache L2 unavailable: {e}")
+            raw = None
+
+        if raw is not None:
+            principal = Principal.from_json(raw)
+            self.users.put(user_id, principal)
+            self.l2_hits += 1
+            return principal
+
+        self.misses += 1
+        return None
+
+    async def put(self, principal: Principal) -> None:
+        self.users.put(principal.id, principal)
+        try:
+            await get_redis().set(
+                self._redis_key(principal.id),
+                principal.to_json(),
+                ex=settings.principal_cache_redis_ttl,
+            )
+        except Exception as e:
+            logger.warning(f"Principal cache L2 unavailable: {e}")
+
+    async def invalidate(self, user_id: int) -> None:
+        """Call after committing any change to the user's row"""
+        self.users.pop(user_id)
+        try:
+            await get_redis().delete(self._redis_key(user_id))
+        except Exception as e:
+            logger.warning(f"Failed to drop principal {user_id} from Redis: {e}")
+        await invalidation_bus.publish("principal", user_id)
+
+    def stats(self) -> dict:
+        lookups = self.l1_hits + self.l2_hits + self.misses
+        return {
+            "l1_hits": self.l1_hits,
+            "l2_hits": self.l2_hits,
+            "misses": self.misses,
+            "hit_rate": (self.l1_hits + self.l2_hits) / lookups if lookups else 0.0,
+            "l1_size": len(self.users),
+            "tokens": len(self.tokens),
+        }
+
+
+principal_cache = PrincipalCache()
@@ -4,15 +4,41 @@ from slowapi.errors import RateLimitExceeded
 from fastapi import Request, HTTPException, status
 from fastapi.responses import JSONResponse
 import logging
+from .config import settings
+from .redis import get_sync_pool
 
 logger = logging.getLogger(__name__)
 
+
+def _storage_config() -> dict:
+    """
+    Limiter storage settings.
+
+    With the redis backend every worker shares one set of counters. Each
+    check is a single atomic Lua call (sliding-window-counter strategy)
+    over the shared connection pool; if Redis errors or times out the
+    limiter falls back to per-process in-memory counters until it
+    recovers.
+    """
+    if settings.rate_limit_backend == "redis":
+        return {
+            "storage_uri": f"redis://{settings.redis_host}:{settings.redis_port}",
+            "storage_options": {"connection_pool": get_sync_pool()},
+            "in_memory_fallback_enabled": True,
+            "strategy": settings.rate_limit_strategy,
+        }
+    return {
+        "storage_uri": "memory://",
+        "strategy": settings.rate_limit_strategy,
+    }
+
 # Initialize limiter
 limiter = Limiter(
     key_func=get_remote_address,  # Rate limit by IP address
     default_limits=["200/hour"],   # Default:  200 requests per hour per IP
-    storage_uri="memory://",       # Use in-memory storage (or Redis for production)
-    # For Redis: storage_uri="redis://localhost:6379"
+    key_prefix="givehub",
+    enabled=settings.rate_limit_enabled,
+    **_storage_config()
 )
 
 # Custom rate limit exceeded handler
@@ -20,7 +46,7 @@ def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded) -> JSO
     """
     Custom handler for rate limit exceeded errors
     """
-    logger.warning(f"Rate limit exceeded for IP: {get_remote_address(request)}")
+    logger.warning(f"Rate limit exceeded for {get_user_identifier(request)}")
     
     return JSONResponse(
         status_code=status.HTTP_429_TOO_MANY_REQUESTS,
@@ -36,13 +62,13 @@ def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded) -> JSO
 def get_user_identifier(request: Request) -> str:
     """
     Get user identifier for rate limiting
-    Returns user email if authenticated, otherwise IP address
+    Returns user id if authenticated, otherwise IP address
     """
     try:
-        # Try to get user from request state (set by authentication)
-        if hasattr(request.state, "user"):
-            user = request.state.user
-            return f"user:{user.email}"
+        # Set by get_current_user, which runs before the limit check
+        user = getattr(request.state, "user", None)
+        if user is not None:
+            return f"user:{user.id}"
         
         # Fallback to IP address
         return f"ip:{get_remote_address(request)}"
@@ -54,5 +80,7 @@ def get_user_identifier(request: Request) -> str:
 user_limiter = Limiter(
     key_func=get_user_identifier,
     default_limits=["100/hour"],
-    storage_uri="memory://"
-)
\ No newline at end of file
+    key_prefix="givehub",
+    enabled=settings.rate_limit_enabled,
+    **_storage_config()
+)
@@ -0,0 +1,89 @@
+import time
+import redis
+import redis.asyncio
+from redis.asyncio.client import Pipeline
+from .config import settings
+from .metrics import redis_latency
+
+_sync_pool: redis.ConnectionPool | None = None
+_async_client: redis.asyncio.Redis | None = None
+
+
+class InstrumentedPipeline(Pipeline):
+    async def execute(self, raise_on_error: bool = True):
+        start = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            redis_latency.observe(time.perf_counter() - start, "PIPELINE")
+
+
+class InstrumentedRedis(redis.asyncio.Redis):
+    """asyncio Redis client that times every command (and every pipeline as one)"""
+
+    async def execute_command(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            redis_latency.observe(time.perf_counter() - start, str(args[0]).upper())
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> Pipeline:
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+def async_client_class() -> type[redis.asyncio.Redis]:
+    """The timed client when metrics are on, the plain one otherwise"""
+    return InstrumentedRedis if settings.metrics_enabled else redis.asyncio.Redis
+
+
+def get_redis() -> redis.asyncio.Redis:
+    """Shared asyncio Redis client (string responses)"""
+    global _async_client
+    if _async_client is None:
+        _async_client = async_client_class()(
+            host=settings.redis_host,
+            port=settings.redis_port,
+            username=settings.redis_user or None,
+            password=settings.redis_pass or None,
+            max_connections=settings.redis_max_connections,
+            decode_responses=True,
+        )
+    return _async_client
+
+
+async def close_redis() -> None:
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+
+def get_sync_pool() -> redis.ConnectionPool:
+    """
+    Shared blocking connection pool.
+
+    Used by code that can't await (the slowapi rate limiter), so it is
+    tuned with short socket timeouts: a slow Redis should fail fast
+    rather than stall the request.
+    """
+    global _sync_pool
+    if _sync_pool is None:
+        _sync_pool = redis.ConnectionPool(
+            host=settings.redis_host,
+            port=settings.redis_port,
+            username=settings.redis_user or None,
+            password=settings.redis_pass or None,
+            max_connections=settings.redis_max_connections,
+            socket_timeout=settings.redis_socket_timeout,
+            socket_connect_timeout=settings.redis_socket_timeout,
+            health_check_interval=30,
+        )
+    return _sync_pool
+
+
+def close_sync_pool() -> None:
+    global _sync_pool
+    if _sync_pool is not None:
+        _sync_pool.disconnect()
+        _sync_pool = None
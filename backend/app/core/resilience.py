@@ -0,0 +1,136 @@
+import logging
+import time
+from collections import deque
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveLimiter:
+    """
+    AIMD limit on concurrent calls to a dependency.
+
+    Every call that finishes healthy and under its latency target raises the
+    limit by ``1/limit`` (about +1 per round of calls); a failure or a slow
+    call multiplies it by ``backoff``, at most once per target so one slow
+    burst only counts once. The target is ``latency_target`` unless the
+    call passes its own (operations with longer deadlines are allowed to
+    take longer). Calls over the limit are refused immediately instead of
+    queueing behind a slow dependency.
+    """
+
+    def __init__(self, initial: int, min_limit: int, max_limit: int, latency_target: float, backoff: float = 0.7):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.in_flight = 0
+        self._last_decrease = 0.0
+
+    def try_acquire(self) -> bool:
+        if self.in_flight >= int(self.limit):
+            return False
+        self.in_flight += 1
+        return True
+
+    def has_headroom(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    def release(self, latency: Optional[float] = None, ok: bool = True, latency_target: Optional[float] = None) -> None:
+        """Return a slot; ``latency=None`` (cancelled or never sent) leaves the limit alone"""
+        self.in_flight -= 1
+        if latency is None:
+            return
+
+        target = latency_target or self.latency_target
+        if ok and latency <= target:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            return
+
+        now = time.monotonic()
+        if now - self._last_decrease >= target:
+            self._last_decrease = now
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+            logger.info(f"Concurrency limit lowered to {self.limit:.1f} ({'slow' if ok else 'failed'} call, {latency:.2f}s)")
+
+
+class CircuitBreaker:
+    """
+    Opens when at least ``failure_rate`` of the calls in the last ``window``
+    seconds failed (once there were ``min_calls`` of them), refusing calls
+    for ``reset_timeout`` seconds. Then up to ``half_open_calls`` probes are
+    let through: a healthy probe closes the circuit, a failed one reopens it.
+    """
+
+    CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+
+    def __init__(self, name: str, failure_rate: float, min_calls: int, window: float, reset_timeout: float, half_open_calls: int):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.reset_timeout = reset_timeout
+        self.half_open_calls = half_open_calls
+        self.state = self.CLOSED
+        self._calls: deque = deque()  # (timestamp, ok)
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+
+    def _trim(self, now: float) -> None:
+        while self._calls and self._calls[0][0] < now - self.window:
+            _, ok = self._calls.popleft()
+            if not ok:
+                self._failures -= 1
+
+    def allow(self) -> bool:
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            self._probes = 0
+            logger.info(f"Circuit {self.name} half-open, probing")
+
+        if self.state == self.HALF_OPEN:
+            if self._probes >= self.half_open_calls:
+                return False
+            self._probes += 1
+        return True
+
+    def cancel(self) -> None:
+        """Give back an allowed call that never happened"""
+        if self.state == self.HALF_OPEN and self._probes:
+            self._probes -= 1
+
+    def record(self, ok: bool) -> None:
+        now = time.monotonic()
+        if self.state == self.HALF_OPEN:
+            if ok:
+                self.state = self.CLOSED
+                self._calls.clear()
+                self._failures = 0
+                logger.info(f"Circuit {self.name} closed")
+            else:
+                self._open(now)
+            return
+        if self.state == self.OPEN:
+            return
+
+        self._calls.append((now, ok))
+        if not ok:
+            self._failures += 1
+        self._trim(now)
+        if len(self._calls) >= self.min_calls and self._failures / len(self._calls) >= self.failure_rate:
+            self._open(now)
+
+    def _open(self, now: float) -> None:
+        self.state = self.OPEN
+        self._opened_at = now
+        logger.warning(f"Circuit {self.name} opened for {self.reset_timeout:.0f}s ({self._failures}/{len(self._calls)} recent calls failed)")
+
+    def retry_after(self) -> int:
+        """Seconds until the circuit will let a probe through"""
+        if self.state != self.OPEN:
+            return 1
+        return max(1, int(self.reset_timeout - (time.monotonic() - self._opened_at)) + 1)
@@ -1,16 +1,26 @@
 from passlib.context import CryptContext
 from jose import jwt, JWTError
-from fastapi.security import OAuth2PasswordBearer
+from fastapi.security import OAuth2PasswordBearer, APIKeyHeader
+import hmac
 from datetime import datetime, timedelta
-from fastapi import FastAPI, Response, HTTPException, APIRouter, Depends, status
+from fastapi import FastAPI, Response, HTTPException, APIRouter, Depends, status, Request
 from ..db.database import get_db
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from .config import settings
 from ..schemas.user import TokenData
 from ..db.models import User, Donation
+from .principal_cache import Principal, principal_cache
+from .hashing import hashing_executor
 
-password_context = CryptContext(schemes=["argon2"], deprecated="auto")
+password_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__time_cost=settings.argon2_time_cost,
+    argon2__memory_cost=settings.argon2_memory_cost,
+    argon2__parallelism=settings.argon2_parallelism,
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
+admin_token_header = APIKeyHeader(name="X-Admin-Token", auto_error=False)
 
 ALGORITHM = settings.algorithm
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_time
@@ -22,6 +32,16 @@ def hash_password(password: str) ->str:
 def verify_password(hashed: str, password: str) -> bool:
     return password_context.verify(hashed, password)
 
+def verify_and_update_password(password: str, hashed: str) -> tuple[bool, str | None]:
+    """Verify, and return a new hash if the stored one uses outdated argon2 parameters"""
+    return password_context.verify_and_update(password, hashed)
+
+async def hash_password_async(password: str) -> str:
+    return await hashing_executor.run(hash_password, password)
+
+async def verify_and_update_password_async(password: str, hashed: str) -> tuple[bool, str | None]:
+    return await hashing_executor.run(verify_and_update_password, password, hashed)
+
 def create_access_token(data: dict):
     to_encode = data.copy()
     expiry = datetime.utcnow() + timedelta(ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -38,18 +58,42 @@ def verify_access_token(token: str, credentials_exception):
 
         if not id:
             raise credentials_exception
-        token_data = TokenData(id=id)
+        token_data = TokenData(id=id, exp=payload.get("exp"))
     except JWTError:
         raise credentials_exception
 
     return token_data
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(request: Request, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> Principal:
     credentials_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
     detail=f"could not validate credentials", headers={"WWW-Authenticate": "Bearer"})
 
-    token = verify_access_token(token, credentials_exception)
-    user = db.get(User, token.id)
-    if not user:
-        raise credentials_exception
-    return user
\ No newline at end of file
+    # warm path: token and principal both cached, no JWT decode and no DB work
+    user_id = principal_cache.user_id_for_token(token)
+    if user_id is None:
+        token_data = verify_access_token(token, credentials_exception)
+        user_id = token_data.id
+    else:
+        token_data = None
+
+    user = await principal_cache.get(user_id)
+    if user is None:
+        row = await db.get(User, user_id)
+        if not row:
+            raise credentials_exception
+        user = Principal.from_user(row)
+        await principal_cache.put(user)
+
+    if token_data is not None:
+        principal_cache.remember_token(token, user_id, token_data.exp)
+
+    # lets the rate limiter key authenticated routes by user id
+    request.state.user = user
+    return user
+
+def require_admin(token: str | None = Depends(admin_token_header)):
+    """Guard for operational endpoints; disabled unless ADMIN_TOKEN is configured"""
+    if not settings.admin_token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not token or not hmac.compare_digest(token, settings.admin_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token")
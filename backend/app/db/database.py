@@ -1,24 +1,125 @@
+from typing import AsyncIterator
 from sqlalchemy import create_engine, MetaData
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from ..core.config import settings
+from .pool_metrics import InstrumentedAsyncPool, instrument_engine
+from ..core.metrics import instrument_sqlalchemy
+from .profiler import instrument_profiler
 
-DATABASE_URL = settings.database_url
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
+def to_async_url(url: str) -> str:
+    """Map a sync DATABASE_URL (psycopg2/pysqlite) onto its asyncio driver"""
+    parsed = make_url(url)
+    if parsed.get_dialect().is_async:
+        return url
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver configured for {parsed.get_backend_name()}")
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+# Engines are built on first use (normally by the app lifespan), not at import
+_engine = None
+_async_engine = None
+
+
+def get_engine():
+    """Sync engine: schema management and offline scripts"""
+    global _engine
+    if _engine is None:
+        _engine = create_engine(settings.database_url)
+        SessionLocal.configure(bind=_engine)
+    return _engine
+
+
+def pool_options(url: str) -> dict:
+    """Pool settings for the async engine (in-memory SQLite can't be pooled)"""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "poolclass": InstrumentedAsyncPool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+
+def get_async_engine() -> AsyncEngine:
+    """Async engine used by the request handlers, instrumented for pool stats, metrics and profiling"""
+    global _async_engine
+    if _async_engine is None:
+        url = settings.async_database_url or to_async_url(settings.database_url)
+        _async_engine = create_async_engine(url, **pool_options(url))
+        instrument_engine(_async_engine.sync_engine)
+        if settings.metrics_enabled:
+            instrument_sqlalchemy(_async_engine.sync_engine)
+        if settings.query_profiler_enabled:
+            instrument_profiler(_async_engine.sync_engine)
+        AsyncSessionLocal.configure(bind=_async_engine)
+    return _async_engine
+
+
+class _LazySessionMaker(async_sessionmaker):
+    """async_sessionmaker that creates the engine the first time a session is opened"""
 
-from sqlalchemy.orm import Session
+    def __call__(self, **local_kw) -> AsyncSession:
+        if self.kw.get("bind") is None:
+            get_async_engine()
+        return super().__call__(**local_kw)
 
-def get_db() -> Session:
-    db = SessionLocal()
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+AsyncSessionLocal = _LazySessionMaker(autoflush=False, expire_on_commit=False)
+
+
+async def warm_up(connections: int) -> None:
+    """Open ``connections`` pooled connections up front so the first requests don't pay for connecting"""
+    engine = get_async_engine()
+    held = []
     try:
-        yield db
-    except Exception:
-        db.rollback()
-        raise        # 🔥 THIS LINE IS MANDATORY
+        for _ in range(connections):
+            held.append(await engine.connect())
     finally:
-        db.close()
+        for connection in held:
+            await connection.close()
+
+
+async def dispose_engines() -> None:
+    """Close every pooled connection; the next use builds fresh engines"""
+    global _engine, _async_engine
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        AsyncSessionLocal.configure(bind=None)
+    if _engine is not None:
+        _engine.dispose()
+        _engine = None
+        SessionLocal.configure(bind=None)
+
+
+def __getattr__(name):
+    # module-level names kept for callers that predate the lazy engines
+    if name == "engine":
+        return get_engine()
+    if name == "async_engine":
+        return get_async_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+Base = declarative_base()
 
-    
\ No newline at end of file
+async def get_db() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        except Exception:
+            await db.rollback()
+            raise        # 🔥 THIS LINE IS MANDATORY
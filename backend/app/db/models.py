@@ -1,4 +1,4 @@
-from sqlalchemy import Integer, String, Column, DateTime, func, Boolean, ForeignKey
+from sqlalchemy import Integer, String, Column, DateTime, func, Boolean, ForeignKey, Index, Text
 from sqlalchemy.orm import relationship
 from .database import Base
 
@@ -21,7 +21,46 @@ class Donation(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     amount = Column(Integer, nullable=False, default=0)
     status = Column(Boolean, default=False)
-    payment_reference = Column(String, nullable=False)
+    payment_reference = Column(String, nullable=False, unique=True, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expired_at = Column(DateTime(timezone=True))  # abandoned order, set by the reconciliation job
 
     user = relationship("User", back_populates="donations")
+
+class ProcessedWebhookEvent(Base):
+    """PayPal webhook events that were fully handled (durable dedup record)"""
+    __tablename__ = "processed_webhook_events"
+    event_id = Column(String(64), primary_key=True)
+    event_type = Column(String(64))
+    processed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class WebhookInbox(Base):
+    """Raw PayPal webhook deliveries, persisted before they are acknowledged"""
+    __tablename__ = "webhook_inbox"
+    id = Column(Integer, primary_key=True)
+    event_id = Column(String(64), unique=True)
+    event_type = Column(String(64))
+    order_key = Column(String(64), nullable=False)
+    headers = Column(Text, nullable=False)
+    body = Column(Text, nullable=False)
+    status = Column(String(16), nullable=False, default="pending", index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text)
+    received_at = Column(DateTime(timezone=True), server_default=func.now())
+    claimed_at = Column(DateTime(timezone=True))
+    processed_at = Column(DateTime(timezone=True))
+
+class JobCheckpoint(Base):
+    """How far a resumable batch job got (the last id it finished)"""
+    __tablename__ = "job_checkpoints"
+    name = Column(String(64), primary_key=True)
+    position = Column(Integer, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+# Keyset pagination of a user's donations (newest first) is a single range scan
+Index(
+    "ix_donations_user_created_id",
+    Donation.user_id,
+    Donation.created_at.desc(),
+    Donation.id.desc(),
+)
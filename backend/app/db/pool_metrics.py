@@ -0,0 +1,100 @@
+import threading
+import time
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class PoolStats:
+    """Counters for connection pool checkouts, waits and connection churn"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pool = None
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.checkouts = 0
+            self.checkins = 0
+            self.checkout_timeouts = 0
+            self.checkout_wait_total = 0.0
+            self.checkout_wait_max = 0.0
+            self.connects = 0
+            self.closes = 0
+            self.invalidations = 0
+
+    def record_checkout_wait(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.checkout_wait_total += seconds
+            if seconds > self.checkout_wait_max:
+                self.checkout_wait_max = seconds
+            if timed_out:
+                self.checkout_timeouts += 1
+
+    def snapshot(self) -> dict:
+        pool = self.pool
+        with self._lock:
+            waits = self.checkouts or 1
+            return {
+                "size": pool.size() if pool is not None else 0,
+                "checked_out": pool.checkedout() if pool is not None else 0,
+                "checked_in": pool.checkedin() if pool is not None else 0,
+                # QueuePool counts from -pool_size until the pool is full
+                "overflow": max(pool.overflow(), 0) if pool is not None else 0,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "checkout_timeouts": self.checkout_timeouts,
+                "checkout_wait_avg_ms": self.checkout_wait_total / waits * 1000,
+                "checkout_wait_max_ms": self.checkout_wait_max * 1000,
+                "checkout_wait_total_s": self.checkout_wait_total,
+                "connects": self.connects,
+                "closes": self.closes,
+                "invalidations": self.invalidations,
+            }
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records how long each checkout waited for a connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            pool_stats.record_checkout_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_stats.record_checkout_wait(time.perf_counter() - start)
+        return conn
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Attach pool event listeners that feed ``pool_stats``"""
+    pool_stats.pool = engine.pool
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_conn, record, proxy):
+        pool_stats.checkouts += 1
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_conn, record):
+        pool_stats.checkins += 1
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_conn, record):
+        pool_stats.connects += 1
+
+    @event.listens_for(engine, "close")
+    def _close(dbapi_conn, record):
+        pool_stats.closes += 1
+
+    @event.listens_for(engine, "invalidate")
+    def _invalidate(dbapi_conn, record, exception):
+        pool_stats.invalidations += 1
+
+    @event.listens_for(engine, "engine_disposed")
+    def _disposed(engine):
+        pool_stats.pool = engine.pool
@@ -0,0 +1,186 @@
+import contextvars
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_MAX_PARAMS_REPR = 500
+
+
+@dataclass
+class StatementStats:
+    count: int = 0
+    total: float = 0.0
+    params: set = field(default_factory=set)
+
+
+@dataclass
+class RequestProfile:
+    """Queries issued while serving one request"""
+    method: str
+    path: str
+    queries: int = 0
+    db_time: float = 0.0
+    statements: Dict[str, StatementStats] = field(default_factory=dict)
+    slow: List[dict] = field(default_factory=list)
+
+    def n_plus_one(self) -> List[dict]:
+        """Statements run repeatedly with different parameters (a loop issuing one query per row)"""
+        return [
+            {"statement": statement, "count": stats.count, "distinct_params": len(stats.params),
+             "total_ms": stats.total * 1000}
+            for statement, stats in self.statements.items()
+            if stats.count >= settings.query_profiler_n_plus_one and len(stats.params) > 1
+        ]
+
+    def summary(self) -> dict:
+        return {
+            "method": self.method,
+            "path": self.path,
+            "queries": self.queries,
+            "db_ms": self.db_time * 1000,
+            "n_plus_one": self.n_plus_one(),
+            "slow": self.slow,
+        }
+
+
+_current: contextvars.ContextVar[Optional[RequestProfile]] = contextvars.ContextVar("query_profile", default=None)
+
+
+class QueryProfiler:
+    """
+    Opt-in per-request query profiling (QUERY_PROFILER_ENABLED).
+
+    Engine events attribute every statement to the request being served
+    (via a context variable, which SQLAlchemy carries into its greenlets),
+    counting queries and DB time, grouping repeated statements to spot
+    N+1 patterns and capturing slow statements with their parameters and,
+    optionally, their EXPLAIN plan. Recent request summaries and slow
+    queries are kept in ring buffers for /admin/profiler.
+    """
+
+    def __init__(self):
+        self.requests: deque = deque(maxlen=settings.query_profiler_buffer_size)
+        self.slow_queries: deque = deque(maxlen=settings.query_profiler_buffer_size)
+
+    @property
+    def enabled(self) -> bool:
+        return settings.query_profiler_enabled
+
+    def begin(self, method: str, path: str) -> contextvars.Token:
+        return _current.set(RequestProfile(method, path))
+
+    def end(self, token: contextvars.Token) -> RequestProfile:
+        profile = _current.get()
+        _current.reset(token)
+        self.requests.append(profile.summary())
+        for entry in profile.n_plus_one():
+            logger.warning(f"Possible N+1 in {profile.method} {profile.path}: {entry['count']}x {entry['statement'][:120]}")
+        return profile
+
+    def snapshot(self, limit: int = 50) -> dict:
+        return {
+            "enabled": self.enabled,
+            "slow_query_threshold_ms": settings.slow_query_threshold * 1000,
+            "requests": list(self.requests)[-limit:],
+            "slow_queries": list(self.slow_queries)[-limit:],
+        }
+
+    def record(self, conn, cursor, statement: str, parameters, elapsed: float) -> None:
+        profile = _current.get()
+        if profile is not None:
+            profile.queries += 1
+            profile.db_time += elapsed
+            stats = profile.statements.get(statement)
+            if stats is None:
+                stats = profile.statements[statement] = StatementStats()
+            stats.count += 1
+            stats.total += elapsed
+            stats.params.add(repr(parameters)[:_MAX_PARAMS_REPR])
+
+        if elapsed >= settings.slow_query_threshold:
+            entry = {
+                "statement": statement,
+                "params": repr(parameters)[:_MAX_PARAMS_REPR],
+                "ms": elapsed * 1000,
+                "path": f"{profile.method} {profile.path}" if profile else None,
+                "at": time.time(),
+            }
+            if settings.slow_query_explain:
+                entry["plan"] = self._explain(conn, statement, parameters)
+            self.slow_queries.append(entry)
+            if profile is not None:
+                profile.slow.append(entry)
+            logger.warning(f"Slow query ({elapsed * 1000:.1f}ms): {statement[:200]}")
+
+    def _explain(self, conn, statement: str, parameters) -> Optional[List[str]]:
+        # only plain SELECTs: EXPLAIN on anything else may execute it or abort the transaction
+        if not statement.lstrip().upper().startswith("SELECT"):
+            return None
+        prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+        try:
+            cursor = conn.connection.cursor()
+            try:
+                cursor.execute(prefix + statement, parameters)
+                return [" ".join(str(col) for col in row) for row in cursor.fetchall()]
+            finally:
+                cursor.close()
+        except Exception as e:
+            return [f"EXPLAIN failed: {e}"]
+
+
+query_profiler = QueryProfiler()
+
+
+def instrument_profiler(engine: Engine) -> None:
+    """Attach the profiler's cursor events to ``engine`` (the sync engine behind the async one)"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if query_profiler.enabled and context is not None:
+            context._profiler_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_profiler_start", None)
+        if started is not None:
+            query_profiler.record(conn, cursor, statement, parameters, time.perf_counter() - started)
+
+
+class QueryProfilerMiddleware:
+    """Opens a RequestProfile per request; adds X-DB-* headers when QUERY_PROFILER_HEADERS is on"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not query_profiler.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        token = query_profiler.begin(scope["method"], scope["path"])
+        profile = _current.get()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and settings.query_profiler_headers:
+                headers = list(message.get("headers", []))
+                headers += [
+                    (b"x-db-queries", str(profile.queries).encode()),
+                    (b"x-db-time-ms", f"{profile.db_time * 1000:.2f}".encode()),
+                    (b"x-db-n-plus-one", str(len(profile.n_plus_one())).encode()),
+                ]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            query_profiler.end(token)
@@ -0,0 +1,29 @@
+"""
+Rebuild the Redis leaderboard and platform totals from the database.
+
+    python -m app.jobs.rebuild_leaderboard
+"""
+import asyncio
+import logging
+
+from ..core.redis import close_redis
+from ..db.database import AsyncSessionLocal, dispose_engines
+from ..services.leaderboard import leaderboard
+
+
+async def main() -> None:
+    try:
+        async with AsyncSessionLocal() as db:
+            summary = await leaderboard.rebuild(db)
+        if summary is None:
+            print("A leaderboard rebuild is already running")
+        else:
+            print(f"Leaderboard rebuilt: {summary}")
+    finally:
+        await close_redis()
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,42 @@
+"""
+Settle or expire donations left pending (tab closed before capture,
+webhook lost) by asking PayPal what happened to each order.
+
+    python -m app.jobs.reconcile_donations [--max-calls N] [--restart]
+
+Resumes from the last checkpoint unless ``--restart`` is given;
+``--max-calls`` caps the PayPal lookups made by this run.
+"""
+import argparse
+import asyncio
+import logging
+from dataclasses import asdict
+
+from ..core.redis import close_redis
+from ..db.database import dispose_engines
+from ..services.outbox import email_outbox
+from ..services.paypal_service import paypal_service
+from ..services.reconciliation import reconciler
+
+
+async def main(max_calls: int | None, restart: bool) -> None:
+    await paypal_service.startup()
+    await email_outbox.start()
+    try:
+        summary = await reconciler.run(max_calls=max_calls, restart=restart)
+        print(f"Reconciliation summary: {asdict(summary)}")
+    finally:
+        await email_outbox.stop()
+        await paypal_service.shutdown()
+        await close_redis()
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-calls", type=int, default=None, help="stop after this many PayPal lookups")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and start from the first id")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(args.max_calls, args.restart))
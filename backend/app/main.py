@@ -1,15 +1,13 @@
-from fastapi import FastAPI, Request, Depends
-from sqlalchemy.orm import Session
-from .db.database import Base, engine, get_db
-from .db.models import User, Donation
-from .routers import users, donations, webhook
-from .core.rate_limit import limiter, rate_limit_exceeded_handler
-from slowapi.errors import RateLimitExceeded
+import asyncio
 import logging
-from fastapi.middleware.cors import CORSMiddleware
-from .core.security import get_current_user
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+
 from .core.config import settings
 
+_imported_at = time.perf_counter()
 
 logging.basicConfig(
     level=logging.INFO,
@@ -18,50 +16,128 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
-app = FastAPI(
-    title="GiveHub API",
-    description="Donation platform with PayPal integration",
-    version="1.0.0"
-)
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[
-        "http://localhost:3000",
-        "http://localhost:5173",
-        settings.frontend_url,
-    ],
-    allow_credentials=False,  # 🔑 IMPORTANT
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+async def _warm(name: str, awaitable) -> None:
+    try:
+        await awaitable
+    except Exception as e:
+        logger.warning(f"Could not warm {name} on startup: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # imported here rather than at module level so that importing app.main stays cheap
+    from .core.cache import invalidation_bus
+    from .core.hashing import hashing_executor
+    from .core.metrics import loop_lag_monitor
+    from .core.redis import close_redis, close_sync_pool, get_redis
+    from .db.database import AsyncSessionLocal, dispose_engines, warm_up
+    from .routers.webhook import process_webhook_event
+    from .services.leaderboard import leaderboard
+    from .services.otp import otp_store
+    from .services.outbox import email_outbox
+    from .services.paypal_service import paypal_service
+    from .services.webhook_pipeline import webhook_pipeline
+
+    if settings.metrics_enabled:
+        loop_lag_monitor.start()
+    await paypal_service.startup()
+    hashing_executor.start()
+    await email_outbox.start()
+    await otp_store.start()
+    await invalidation_bus.start()
+    await webhook_pipeline.start(process_webhook_event)
+
+    if settings.startup_warm:
+        # open pooled connections now so the first requests don't pay for them
+        await asyncio.gather(
+            _warm("database pool", warm_up(settings.db_warm_connections)),
+            _warm("Redis", get_redis().ping()),
+            _warm("PayPal token", paypal_service.get_access_token()),
+        )
+    try:
+        async with AsyncSessionLocal() as db:
+            await leaderboard.ensure_built(db)
+    except Exception as e:
+        logger.warning(f"Could not build the leaderboard on startup: {e}")
+    logger.info(f"Worker ready {(time.perf_counter() - _imported_at) * 1000:.0f}ms after import")
+
+    try:
+        yield
+    finally:
+        await webhook_pipeline.stop()
+        await invalidation_bus.stop()
+        await email_outbox.stop()
+        await otp_store.stop()
+        await paypal_service.shutdown()
+        hashing_executor.stop()
+        await dispose_engines()
+        await close_redis()
+        close_sync_pool()
+        await loop_lag_monitor.stop()
+
+
+def create_app() -> FastAPI:
+    """
+    Build the API. Routers, services and drivers are imported here rather
+    than when app.main is imported; pools are opened and drained by the
+    lifespan. Run with ``uvicorn app.main:create_app --factory``.
+    """
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import ORJSONResponse
+    from slowapi.errors import RateLimitExceeded
+
+    from .core.etag import ETagMiddleware
+    from .core.metrics import MetricsMiddleware
+    from .core.rate_limit import limiter, rate_limit_exceeded_handler
+    from .db.profiler import QueryProfilerMiddleware
+    from .routers import admin, donations, leaderboard, metrics, root, users, webhook
+
+    app = FastAPI(
+        title="GiveHub API",
+        description="Donation platform with PayPal integration",
+        version="1.0.0",
+        default_response_class=ORJSONResponse,
+        lifespan=lifespan
+    )
 
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=[
+            "http://localhost:3000",
+            "http://localhost:5173",
+            settings.frontend_url,
+        ],
+        allow_credentials=False,  # 🔑 IMPORTANT
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
 
+    app.add_middleware(ETagMiddleware)
+    if settings.query_profiler_enabled:
+        app.add_middleware(QueryProfilerMiddleware)
+    if settings.metrics_enabled:
+        app.add_middleware(MetricsMiddleware)
 
-app.state.limiter = limiter
+    app.state.limiter = limiter
 
-app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_handler)
+    app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_handler)
 
-Base.metadata.create_all(bind=engine)
+    app.include_router(root.router)
+    app.include_router(users.router)
+    app.include_router(donations.router)
+    app.include_router(webhook.router)
+    app.include_router(admin.router)
+    app.include_router(leaderboard.router)
+    if settings.metrics_enabled:
+        app.include_router(metrics.router)
 
-@app.get("/")
-@limiter.limit("10/minute")
-def greet(request: Request):
-    return {"message": "Hello from server"}
+    return app
 
-@app.get("/me")
-async def get_current_user_info(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Get current logged-in user's information"""
-    return {
-        "id": current_user.id,
-        "name": current_user. name,
-        "email": current_user.email,
-        "created_at": current_user. created_at
-    }
 
-app.include_router(users.router)
-app.include_router(donations.router)
-app.include_router(webhook.router)
\ No newline at end of file
+def __getattr__(name):
+    # `app.main:app` (without --factory) builds the app on first access
+    if name == "app":
+        app = globals()["app"] = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
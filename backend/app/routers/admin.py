@@ -0,0 +1,76 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+import logging
+from datetime import datetime
+from typing import List, Literal, Optional
+
+from ..core.security import require_admin
+from ..db.database import get_db
+from ..db.pool_metrics import pool_stats
+from ..db.profiler import query_profiler
+from ..core.principal_cache import principal_cache
+from ..services.webhook_events import webhook_events
+from ..services.webhook_pipeline import webhook_pipeline
+from ..services.leaderboard import leaderboard
+from ..services.export import export_response
+from ..services.order_status import order_status_cache
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    dependencies=[Depends(require_admin)]
+)
+
+@router.get("/db-pool")
+async def db_pool_stats():
+    """Connection pool usage, checkout wait times and connection churn"""
+    return pool_stats.snapshot()
+
+@router.get("/profiler")
+async def profiler(limit: int = Query(50, ge=1, le=1000)):
+    """Recent per-request query profiles (counts, DB time, N+1 suspects) and slow queries"""
+    return query_profiler.snapshot(limit)
+
+@router.get("/cache-stats")
+async def cache_stats():
+    """Hit rates for the authenticated-principal and order-status caches"""
+    return {"principals": principal_cache.stats(), "orders": order_status_cache.stats()}
+
+@router.get("/webhook-stats")
+async def webhook_stats():
+    """Webhook deliveries received in this worker, duplicates and pipeline progress"""
+    return {**webhook_events.stats(), "pipeline": webhook_pipeline.stats()}
+
+@router.get("/webhooks/failed")
+async def failed_webhooks(limit: int = Query(100, ge=1, le=1000)):
+    """Webhook deliveries the pipeline gave up on after webhook_max_attempts"""
+    return await webhook_pipeline.failed_deliveries(limit)
+
+@router.post("/webhooks/replay")
+async def replay_webhooks(inbox_id: Optional[List[int]] = Query(None)):
+    """Re-run failed webhook deliveries (all of them, or the given inbox ids)"""
+    return {"replayed": await webhook_pipeline.replay(inbox_id)}
+
+
+@router.post("/leaderboard/rebuild")
+async def rebuild_leaderboard(db: AsyncSession = Depends(get_db)):
+    """Recompute the Redis leaderboard and totals from the database"""
+    summary = await leaderboard.rebuild(db)
+    if summary is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A leaderboard rebuild is already running"
+        )
+    return summary
+
+@router.get("/donations/export")
+async def export_donations(
+    format: Literal["csv", "ndjson"] = "csv",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    user_id: Optional[int] = None,
+):
+    """Every donation (optionally one user's, created in [since, until)), streamed as CSV or NDJSON"""
+    return export_response(format, user_id=user_id, since=since, until=until)
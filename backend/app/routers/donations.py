@@ -1,21 +1,33 @@
-from fastapi import FastAPI, HTTPException, status, Depends, APIRouter, Request
+from fastapi import FastAPI, HTTPException, status, Depends, APIRouter, Request, Response, Query
 import hmac
 import hashlib
-from sqlalchemy.orm import Session
+from sqlalchemy import select, tuple_, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..db.database import get_db
-from ..db.models import Donation, User
+from ..db.models import Donation
 from ..schemas.donation import (
     DonationCreate, 
     DonationResponse, 
+    DonationPage,
+    donation_list_adapter,
+    donation_page_adapter,
     PayPalOrderResponse,
     PayPalCaptureRequest
 )
 from ..core.security import get_current_user
+from ..core.principal_cache import Principal
 from ..services.paypal_service import paypal_service
-from typing import List
+from typing import List, Literal, Optional
+from datetime import datetime
 import logging
-from ..services.email import send_payment_done_email
-from ..core.rate_limit import limiter
+from ..services.settlement import settlement_service
+from ..services.order_status import order_status_cache
+from ..services.webhook_events import webhook_events, Claim
+from ..core.rate_limit import limiter, get_user_identifier
+from ..core.pagination import encode_cursor, decode_cursor
+from ..core.etag import conditional_get, user_versions
+from ..core.serialization import adapter_response
+from ..services.export import export_response
 
 logger = logging.getLogger(__name__)
 
@@ -25,8 +37,8 @@ router = APIRouter(
 )
 
 @router.post("/create-order", response_model=PayPalOrderResponse)
-@limiter.limit("2/minute")
-async def create_donation_order(request: Request,donation: DonationCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+@limiter.limit("2/minute", key_func=get_user_identifier)
+async def create_donation_order(request: Request,donation: DonationCreate, current_user: Principal = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     try:
         logger.info(f"User {current_user.id} creating donation order for ${donation.amount}")
 
@@ -48,8 +60,9 @@ async def create_donation_order(request: Request,donation: DonationCreate, curre
             payment_reference=order["id"]
         )
         db.add(new_donation)
-        db.commit()
-        db.refresh(new_donation)
+        await db.commit()
+        await db.refresh(new_donation)
+        await user_versions.bump(current_user.id)
 
         logger.info(f"Order created: {order['id']}")
 
@@ -58,15 +71,18 @@ async def create_donation_order(request: Request,donation: DonationCreate, curre
             "status": order["status"],
             "approval_url": approval_url
         }
+    except HTTPException as e:
+        await db.rollback()
+        raise e
     except Exception as e:
         logger.error(f"Error creating order: {str(e)}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         detail=str(e))
 
 @router.post("/capture-order", response_model=DonationResponse)
-@limiter.limit("10/minute")
-async def capture_donation_order(request: Request,capture_request: PayPalCaptureRequest, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+@limiter.limit("10/minute", key_func=get_user_identifier)
+async def capture_donation_order(request: Request,capture_request: PayPalCaptureRequest, current_user: Principal = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
 
     try:
         logger.info(f"created a capture order request for user: {current_user.id}")
@@ -78,7 +94,7 @@ async def capture_donation_order(request: Request,capture_request: PayPalCapture
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
             detail="Payment capture Failed")
 
-        donation = db.query(Donation).filter(Donation.payment_reference == capture_request.order_id, Donation.user_id == current_user.id).first()
+        donation = await db.scalar(select(Donation).where(Donation.payment_reference == capture_request.order_id, Donation.user_id == current_user.id))
 
         if not donation:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
@@ -90,42 +106,88 @@ async def capture_donation_order(request: Request,capture_request: PayPalCapture
             logger.error(f"Payment tampering detected: expected {donation.amount}, got {captured_amount}")
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Payment amount mismatch")
         
-        donation.status = True
-
-        current_user.total_donated += donation.amount
-
-        db.commit()
-        db.refresh(donation)
-
-        send_payment_done_email(current_user.email, donation.amount)
+        # a webhook may have settled it already; only the first settlement counts
+        await settlement_service.settle(db, capture_request.order_id, user_id=current_user.id)
+        await db.refresh(donation)
 
         logger.info(f"order captured successfully")
 
         return donation
 
     except HTTPException as e:
-        db.rollback()
+        await db.rollback()
         raise e
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         detail=str(e))
 
-@router.get("/my-donations", response_model=List[DonationResponse])
-@limiter.limit("20/minute")
-def get_my_donations(request: Request,skip: int = 0,limit: int = 10,db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    donations = db.query(Donation).filter(Donation.user_id == current_user.id).order_by(Donation.created_at.desc()).offset(skip).limit(limit).all()
-
-    if not donations:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
-        detail=f"no donations has been done yet")
-
-    return donations
-
-@router.get("/{donation_id}", response_model=DonationResponse)
-@limiter.limit("20/minute")
-def get_donation(request: Request, donation_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    donation = db.query(Donation).filter(Donation.id == donation_id, Donation.user_id == current_user.id).first()
+async def fetch_donation_page(db: AsyncSession, user_id: int, limit: int, cursor: Optional[str] = None, skip: int = 0):
+    """
+    One page of a user's donations, newest first, plus the cursor for the next page.
+
+    With a cursor the page is a keyset range over (created_at, id) served by
+    ix_donations_user_created_id, so cost doesn't grow with depth.
+    """
+    query = select(Donation).where(Donation.user_id == user_id)
+
+    if cursor:
+        created_at, last_id = decode_cursor(cursor)
+        created_col = Donation.created_at
+        if db.get_bind().dialect.name == "sqlite":
+            # SQLite keeps server-default timestamps as text without microseconds
+            created_col, created_at = func.datetime(created_col), func.datetime(created_at)
+        query = query.where(tuple_(created_col, Donation.id) < tuple_(created_at, last_id))
+    elif skip:
+        query = query.offset(skip)
+
+    # one extra row tells us whether there is a next page
+    query = query.order_by(Donation.created_at.desc(), Donation.id.desc()).limit(limit + 1)
+    donations = (await db.scalars(query)).all()
+
+    next_cursor = None
+    if len(donations) > limit:
+        donations = donations[:limit]
+        last = donations[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+
+    return donations, next_cursor
+
+@router.get("/my-donations", response_model=List[DonationResponse], dependencies=[Depends(conditional_get)])
+@limiter.limit("20/minute", key_func=get_user_identifier)
+async def get_my_donations(request: Request, response: Response, skip: int = 0, limit: int = 10, cursor: Optional[str] = None, db: AsyncSession = Depends(get_db), current_user: Principal = Depends(get_current_user)):
+    """Offset pagination (kept for compatibility); the next keyset cursor is sent as X-Next-Cursor"""
+    donations, next_cursor = await fetch_donation_page(db, current_user.id, limit, cursor=cursor, skip=skip)
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+    return adapter_response(donation_list_adapter, donations, response)
+
+@router.get("/my-donations/page", response_model=DonationPage, dependencies=[Depends(conditional_get)])
+@limiter.limit("20/minute", key_func=get_user_identifier)
+async def get_my_donations_page(request: Request, response: Response, limit: int = Query(10, ge=1, le=100), cursor: Optional[str] = None, db: AsyncSession = Depends(get_db), current_user: Principal = Depends(get_current_user)):
+    """Cursor pagination: pass back next_cursor to fetch the following page"""
+    donations, next_cursor = await fetch_donation_page(db, current_user.id, limit, cursor=cursor)
+
+    return adapter_response(donation_page_adapter, {"items": donations, "next_cursor": next_cursor}, response)
+
+@router.get("/export")
+@limiter.limit("5/minute", key_func=get_user_identifier)
+async def export_my_donations(
+    request: Request,
+    format: Literal["csv", "ndjson"] = "csv",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    current_user: Principal = Depends(get_current_user),
+):
+    """All of the current user's donations (optionally created in [since, until)), streamed as CSV or NDJSON"""
+    return export_response(format, user_id=current_user.id, since=since, until=until)
+
+@router.get("/{donation_id}", response_model=DonationResponse, dependencies=[Depends(conditional_get)])
+@limiter.limit("20/minute", key_func=get_user_identifier)
+async def get_donation(request: Request, donation_id: int, current_user: Principal = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    donation = await db.scalar(select(Donation).where(Donation.id == donation_id, Donation.user_id == current_user.id))
 
     if not donation:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
@@ -134,43 +196,54 @@ def get_donation(request: Request, donation_id: int, current_user: User = Depend
     return donation
 
 @router.get("/verify/{order_id}")
-@limiter.limit("30/minute")
-async def verify_order_status(request: Request,order_id: str, current_user: User = Depends(get_current_user)):
+@limiter.limit("30/minute", key_func=get_user_identifier)
+async def verify_order_status(request: Request,order_id: str, current_user: Principal = Depends(get_current_user)):
     try:
-        order_details = await paypal_service.get_order_details(order_id)
+        order_details = await order_status_cache.get(order_id)
         return {
             "order_id": order_id,
             "status": order_details.get("status"),
             "details": order_details
         }
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         detail=str(e))
 
 @router.post("/paypal-webhook")
-async def paypal_webhook(request: Request, db: Session = Depends(get_db)):
+async def paypal_webhook(request: Request, db: AsyncSession = Depends(get_db)):
     body = await request.body()
     headers = request.headers
     
     payload = await request.json()
+    event_id = payload.get("id")
     event_type = payload.get("event_type")
-    
+
+    if event_id:
+        claim = await webhook_events.claim(event_id, db)
+        if claim is Claim.DUPLICATE:
+            return {"status": "duplicate"}
+        if claim is Claim.IN_PROGRESS:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+            detail="Event is already being processed")
+
+    try:
+        if event_type == "PAYMENT.CAPTURE.COMPLETED":
+            # Payment was captured
+            order_id = payload["resource"]["supplementary_data"]["related_ids"]["order_id"]
+            
+            # Update donation in database
+            await settlement_service.settle(db, order_id)
+    except BaseException:
+        if event_id:
+            await webhook_events.release(event_id)
+        raise
+
+    if event_id:
+        await webhook_events.complete(event_id, event_type, db)
+
     if event_type == "PAYMENT.CAPTURE.COMPLETED":
-        # Payment was captured
-        order_id = payload["resource"]["supplementary_data"]["related_ids"]["order_id"]
-        
-        # Update donation in database
-        donation = db.query(Donation).filter(
-            Donation.payment_reference == order_id
-        ).first()
-        
-        if donation and not donation.status:
-            donation.status = True
-            user = db.query(User).filter(User.id == donation.user_id).first()
-            if user:
-                user.total_donated += donation.amount
-            db.commit()
-        
         return {"status": "success"}
     
-    return {"status": "received"}
\ No newline at end of file
+    return {"status": "received"}
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, HTTPException, Request, Query, status
+import logging
+
+from ..core.rate_limit import limiter
+from ..schemas.leaderboard import LeaderboardPage, PlatformStats
+from ..services.leaderboard import leaderboard
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["leaderboard"])
+
+@router.get("/leaderboard", response_model=LeaderboardPage)
+@limiter.limit("60/minute")
+async def get_leaderboard(request: Request, offset: int = Query(0, ge=0), limit: int = Query(10, ge=1, le=100)):
+    """Top donors by total donated, served from Redis"""
+    try:
+        entries, donors = await leaderboard.top(offset, limit)
+    except Exception as e:
+        logger.error(f"Leaderboard unavailable: {e}")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Leaderboard is temporarily unavailable")
+
+    next_offset = offset + limit if offset + limit < donors else None
+    return {"items": entries, "total_donors": donors, "next_offset": next_offset}
+
+@router.get("/stats", response_model=PlatformStats)
+@limiter.limit("60/minute")
+async def get_platform_stats(request: Request):
+    """Running platform totals, served from Redis"""
+    try:
+        return await leaderboard.stats()
+    except Exception as e:
+        logger.error(f"Platform stats unavailable: {e}")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Stats are temporarily unavailable")
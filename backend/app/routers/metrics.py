@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Response
+
+from ..core.metrics import metrics
+from ..core.hashing import hashing_executor
+from ..db.pool_metrics import pool_stats
+from ..services.outbox import email_outbox
+from ..services.paypal_service import paypal_service
+from ..services.webhook_pipeline import webhook_pipeline
+
+router = APIRouter(tags=["metrics"])
+
+# point-in-time values, read at scrape time
+metrics.gauge("givehub_db_pool_checked_out", "Database connections currently checked out",
+              lambda: pool_stats.snapshot()["checked_out"])
+metrics.gauge("givehub_db_pool_checkout_timeouts", "Checkouts that gave up waiting for a connection",
+              lambda: pool_stats.checkout_timeouts)
+metrics.gauge("givehub_email_outbox_queued", "Emails waiting in the outbox", lambda: email_outbox.queue.qsize())
+metrics.gauge("givehub_email_dead_letters", "Emails parked after repeated failures", lambda: len(email_outbox.dead_letters))
+metrics.gauge("givehub_webhook_queue_depth", "Webhook deliveries waiting for a worker", lambda: webhook_pipeline.depth)
+metrics.gauge("givehub_paypal_concurrency_limit", "Adaptive limit on concurrent PayPal calls", lambda: paypal_service.limiter.limit)
+metrics.gauge("givehub_paypal_in_flight", "PayPal calls currently in flight", lambda: paypal_service.limiter.in_flight)
+metrics.gauge("givehub_paypal_circuit_state", "PayPal circuit breaker: 0 closed, 1 half-open, 2 open", lambda: paypal_service.breaker.state)
+metrics.gauge("givehub_password_hash_pending", "Password hashes queued or running", lambda: hashing_executor.pending)
+
+@router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint (text exposition format)"""
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
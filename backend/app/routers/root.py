@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.etag import conditional_get
+from ..core.principal_cache import Principal
+from ..core.rate_limit import limiter
+from ..core.security import get_current_user
+from ..db.database import get_db
+
+router = APIRouter()
+
+@router.get("/")
+@limiter.limit("10/minute")
+def greet(request: Request):
+    return {"message": "Hello from server"}
+
+@router.get("/me", dependencies=[Depends(conditional_get)])
+async def get_current_user_info(
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get current logged-in user's information"""
+    return {
+        "id": current_user.id,
+        "name": current_user. name,
+        "email": current_user.email,
+        "created_at": current_user. created_at
+    }
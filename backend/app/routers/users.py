@@ -1,16 +1,18 @@
 from ..db.models import User, Donation
 from ..db.database import get_db
-from ..schemas.user import UserCreate, UserReturn, Token, VerifyOtp
+from ..schemas.user import UserCreate, UserReturn, Token, VerifyOtp, ResendOtp
 from fastapi import FastAPI, Response, HTTPException, APIRouter, Depends, status, Request
 from sqlalchemy import select
-from sqlalchemy.orm import Session
-from ..core.security import hash_password, verify_password, create_access_token
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.security import hash_password_async, verify_and_update_password_async, create_access_token
 from fastapi.security.oauth2 import OAuth2PasswordRequestForm
-from ..services.otp import generate_otp, store_otp, redis_client
+from ..services.otp import generate_otp, store_otp, otp_store, OTPResult
 from ..services.email import send_otp_email
 import asyncio
 import logging
 from ..core.rate_limit import limiter
+from ..core.principal_cache import principal_cache
+from ..core.etag import user_versions
 
 logging = logging.getLogger(__name__)
 
@@ -20,20 +22,20 @@ router = APIRouter(
 
 @router.post("/register", status_code=status.HTTP_201_CREATED)
 @limiter.limit("5/hour")
-async def create_user(request: Request,user: UserCreate, db: Session = Depends(get_db)):
+async def create_user(request: Request,user: UserCreate, db: AsyncSession = Depends(get_db)):
     # Check if user already exists
-    existing_user = db.query(User).filter(User.email == user.email).first()
+    existing_user = await db.scalar(select(User).where(User.email == user.email))
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="User with this email already exists"
         )
 
-    user.password = hash_password(user.password)
+    user.password = await hash_password_async(user.password)
     new_user = User(name= user.name, email=user.email, password=user.password)
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     otp = generate_otp()
     await store_otp(user.email, otp)
     send_otp_email(user.email, otp)
@@ -44,35 +46,63 @@ async def create_user(request: Request,user: UserCreate, db: Session = Depends(g
 
 @router.post("/verify-email")
 @limiter.limit("10/hour")
-async def verify_otp(request: Request,data: VerifyOtp, db: Session = Depends(get_db)):
-    stored_otp = await redis_client.get(f"otp:{data.email}")
-    if not stored_otp:
+async def verify_otp(request: Request,data: VerifyOtp, db: AsyncSession = Depends(get_db)):
+    result = await otp_store.verify(data.email, data.otp)
+    if result == OTPResult.EXPIRED:
         raise HTTPException(status_code=status.HTTP_408_REQUEST_TIMEOUT,
         detail="OTP expired")
-    if stored_otp != data.otp:
+    if result == OTPResult.LOCKED:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many attempts, request a new OTP")
+    if result != OTPResult.VERIFIED:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
         detail="Invalid OTP, Try again")
 
-    user = db.query(User).filter(User.email == data.email).first()
+    user = await db.scalar(select(User).where(User.email == data.email))
     user.verified = True
-    db.commit()
-
-    redis_client.delete(f"otp:{data.email}")
+    await db.commit()
+    await principal_cache.invalidate(user.id)
+    await user_versions.bump(user.id)
 
     return {
         "message": "Email verified successfully"
     }
 
+@router.post("/resend-otp")
+@limiter.limit("5/hour")
+async def resend_otp(request: Request, data: ResendOtp, db: AsyncSession = Depends(get_db)):
+    wait = await otp_store.cooldown_remaining(data.email)
+    if wait:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=f"Please wait {wait}s before requesting another OTP",
+        headers={"Retry-After": str(wait)})
+
+    user = await db.scalar(select(User).where(User.email == data.email))
+    if user and not user.verified:
+        otp = generate_otp()
+        await store_otp(user.email, otp)
+        send_otp_email(user.email, otp)
+
+    return {
+        "message": "If the email is registered and unverified, a new OTP has been sent"
+    }
+
 @router.post("/login", response_model=Token)
 @limiter.limit("20/hour")
-def user_login(request: Request,user_creds: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    current_user = db.query(User).filter(User.email == user_creds.username).first()
+async def user_login(request: Request,user_creds: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+    current_user = await db.scalar(select(User).where(User.email == user_creds.username))
     if not current_user:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid credentials")
     
-    if not verify_password(user_creds.password, current_user.password):
+    valid, new_hash = await verify_and_update_password_async(user_creds.password, current_user.password)
+    if not valid:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid credentials")
 
+    if new_hash:
+        # stored hash predates the current argon2 parameters
+        current_user.password = new_hash
+        await db.commit()
+
     if not current_user.verified:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="email not verified")
 
@@ -1,12 +1,17 @@
 from fastapi import APIRouter, Request, HTTPException, Depends, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 import logging
 import json
 
 from ..db.database import get_db
-from ..db.models import Donation, User
-from ..services.webhook_service import webhook_service
-from ..services.email import send_payment_done_email
+from ..db.models import WebhookInbox
+from ..services.webhook_service import webhook_service, Verification, VerificationUnavailable
+from ..services.webhook_events import webhook_events, Claim
+from ..services.webhook_pipeline import webhook_pipeline, order_key_for
+from ..services.settlement import settlement_service
+from ..services.order_status import order_status_cache
 from ..core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -19,61 +24,83 @@ router = APIRouter(
 @router.post("/paypal")
 async def paypal_webhook(
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
-    Handle incoming PayPal webhook events
-    """
-    print("PAYPAL WEBHOOK RECEIVED")
+    Accept a PayPal webhook delivery.
 
+    The raw body and signature headers are stored in the webhook inbox
+    and acknowledged straight away; verification and the donation
+    updates happen in the webhook pipeline workers.
+    """
     try:
         body = await request.body()
         body_str = body.decode("utf-8")
-        headers = dict(request.headers)
 
-        logger.info("Received PayPal webhook")
-        logger.info(f"Event payload preview: {body_str[:200]}")
+        logger.debug(f"Received PayPal webhook: {body_str[:200]}")
 
         event_data = json.loads(body_str)
+        event_id = event_data.get("id")
         event_type = event_data.get("event_type")
-        resource = event_data.get("resource", {})
 
-
-        if not settings.paypal_webhook_id:
-            logger.warning("PAYPAL_WEBHOOK_ID not set — skipping verification")
-        else:
-            is_valid = await webhook_service.verify_webhook_signature(
-                webhook_id=settings.paypal_webhook_id,
-                headers=headers,
-                body=body_str
+        # PayPal retries deliveries; settle duplicates before any verification or DB work
+        if event_id:
+            claim = await webhook_events.claim(event_id, db, wait=False)
+            if claim is not Claim.NEW:
+                logger.info(f"Duplicate PayPal webhook {event_id} acknowledged")
+                return {
+                    "status": "duplicate",
+                    "event_type": event_type
+                }
+
+        if webhook_pipeline.is_saturated():
+            if event_id:
+                await webhook_events.release(event_id)
+            logger.warning("Webhook pipeline is saturated, asking PayPal to retry later")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Webhook queue is full",
+                headers={"Retry-After": "30"}
             )
 
-            if not is_valid:
-                logger.error("Invalid PayPal webhook signature")
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Invalid webhook signature"
-                )
-
-        if event_type == "PAYMENT.CAPTURE.COMPLETED":
-            await handle_payment_completed(resource, db)
-
-        elif event_type == "CHECKOUT.ORDER.APPROVED":
-            await handle_order_approved(resource, db)
-
-        elif event_type == "PAYMENT.CAPTURE.REFUNDED":
-            await handle_payment_refunded(resource, db)
-
-        elif event_type == "PAYMENT.CAPTURE.DENIED":
-            await handle_payment_denied(resource, db)
-
-        else:
-            logger.info(f"Unhandled PayPal event type: {event_type}")
-
-        print("Webhook processed successfully")
+        order_key = order_key_for(event_data)
+        inbox = WebhookInbox(
+            event_id=event_id,
+            event_type=event_type,
+            order_key=order_key,
+            headers=json.dumps({k: v for k, v in request.headers.items() if k.startswith("paypal-")}),
+            body=body_str,
+            status="pending",
+            attempts=0,
+        )
+        db.add(inbox)
+        try:
+            await db.commit()
+        except IntegrityError:
+            # already in the inbox from an earlier delivery
+            await db.rollback()
+            await webhook_events.release(event_id)
+            inbox = await db.scalar(select(WebhookInbox).where(WebhookInbox.event_id == event_id))
+            if inbox is None or inbox.status not in ("rejected", "failed"):
+                return {
+                    "status": "duplicate",
+                    "event_type": event_type
+                }
+            # an earlier attempt gave up; take this delivery as a fresh one
+            inbox.headers = json.dumps({k: v for k, v in request.headers.items() if k.startswith("paypal-")})
+            inbox.body = body_str
+            inbox.status = "pending"
+            inbox.attempts = 0
+            await db.commit()
+        except BaseException:
+            if event_id:
+                await webhook_events.release(event_id)
+            raise
+
+        webhook_pipeline.submit(inbox.id, order_key)
 
         return {
-            "status": "success",
+            "status": "accepted",
             "event_type": event_type
         }
 
@@ -84,84 +111,91 @@ async def paypal_webhook(
         return {"status": "error", "message": str(e)}
 
 
-async def handle_order_approved(resource: dict, db: Session):
-    try:
-        order_id = resource.get("id")
-        logger.info(f"Order approved: {order_id}")
-    except Exception as e:
-        logger.error("Error handling order approved", exc_info=True)
-
-
-async def handle_payment_completed(resource: dict, db: Session):
-    try:
-        order_id = None
-
-        if "supplementary_data" in resource:
-            order_id = resource.get("supplementary_data", {}) \
-                               .get("related_ids", {}) \
-                               .get("order_id")
-
-        if not order_id:
-            order_id = resource.get("id")
+async def process_webhook_event(event_type: str, resource: dict, headers: dict, body_str: str, db: AsyncSession):
+    """Verify the signature and dispatch to the handler for ``event_type``"""
+    if not settings.paypal_webhook_id:
+        logger.warning("PAYPAL_WEBHOOK_ID not set — skipping verification")
+    else:
+        verification = await webhook_service.verify_webhook_signature(
+            webhook_id=settings.paypal_webhook_id,
+            headers=headers,
+            body=body_str
+        )
+
+        if verification is Verification.UNAVAILABLE:
+            # not a verdict on the delivery: the pipeline retries it with backoff
+            raise VerificationUnavailable("PayPal webhook signature could not be verified")
+
+        if verification is not Verification.VALID:
+            logger.error("Invalid PayPal webhook signature")
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid webhook signature"
+            )
 
-        if not order_id:
-            logger.error("Could not extract order_id from webhook")
-            return
+    if event_type == "PAYMENT.CAPTURE.COMPLETED":
+        await handle_payment_completed(resource, db)
 
-        logger.info(f"Processing completed payment for order {order_id}")
+    elif event_type == "CHECKOUT.ORDER.APPROVED":
+        await handle_order_approved(resource, db)
 
-        donation = db.query(Donation).filter(
-            Donation.payment_reference == order_id
-        ).first()
+    elif event_type == "PAYMENT.CAPTURE.REFUNDED":
+        await handle_payment_refunded(resource, db)
 
-        if not donation:
-            logger.error(f"No donation found for order {order_id}")
-            return
+    elif event_type == "PAYMENT.CAPTURE.DENIED":
+        await handle_payment_denied(resource, db)
 
-        if not donation.status:
-            donation.status = True
+    else:
+        logger.info(f"Unhandled PayPal event type: {event_type}")
 
-            user = db.query(User).filter(User.id == donation.user_id).first()
-            if user:
-                user.total_donated += donation.amount
-                send_payment_done_email(user.email, donation.amount)
 
-            db.commit()
-            logger.info(f"Donation {donation.id} marked as completed")
+async def handle_order_approved(resource: dict, db: AsyncSession):
+    try:
+        order_id = resource.get("id")
+        logger.info(f"Order approved: {order_id}")
+        if order_id:
+            await order_status_cache.invalidate(order_id)
+    except Exception as e:
+        logger.error("Error handling order approved", exc_info=True)
 
-    except Exception:
-        db.rollback()
-        logger.error("Error handling completed payment", exc_info=True)
 
+async def handle_payment_completed(resource: dict, db: AsyncSession):
+    # failures propagate to the webhook pipeline, which rolls back and retries
+    order_id = None
 
-async def handle_payment_refunded(resource: dict, db: Session):
-    try:
+    if "supplementary_data" in resource:
         order_id = resource.get("supplementary_data", {}) \
                            .get("related_ids", {}) \
                            .get("order_id")
 
-        if not order_id:
-            logger.error("Could not extract order_id from refund webhook")
-            return
+    if not order_id:
+        order_id = resource.get("id")
+
+    if not order_id:
+        logger.error("Could not extract order_id from webhook")
+        return
+
+    logger.info(f"Processing completed payment for order {order_id}")
+
+    if not await settlement_service.settle(db, order_id):
+        logger.info(f"No pending donation for order {order_id}")
 
-        donation = db.query(Donation).filter(
-            Donation.payment_reference == order_id
-        ).first()
 
-        if donation and donation.status:
-            donation.status = False
-            user = db.query(User).filter(User.id == donation.user_id).first()
-            if user:
-                user.total_donated -= donation.amount
+async def handle_payment_refunded(resource: dict, db: AsyncSession):
+    order_id = resource.get("supplementary_data", {}) \
+                       .get("related_ids", {}) \
+                       .get("order_id")
 
-            db.commit()
-            logger.info(f"Donation {donation.id} refunded")
+    if not order_id:
+        logger.error("Could not extract order_id from refund webhook")
+        return
 
-    except Exception:
-        db.rollback()
-        logger.error("Error handling refund webhook", exc_info=True)
+    if not await settlement_service.refund(db, order_id):
+        logger.info(f"No completed donation to refund for order {order_id}")
 
 
-async def handle_payment_denied(resource: dict, db: Session):
-    order_id = resource.get("id")
+async def handle_payment_denied(resource: dict, db: AsyncSession):
+    order_id = order_key_for({"resource": resource})
     logger.warning(f"Payment denied for order {order_id}")
+    if order_id:
+        await order_status_cache.invalidate(order_id)
@@ -1,18 +1,28 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, TypeAdapter
 from datetime import datetime
+from typing import List
 
 class DonationCreate(BaseModel):
     amount: int  # in INR
 
 class DonationResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     amount: int
     status: bool
     payment_reference: str | None
     created_at: datetime
 
-    class config:
-        from_attributes: True
+class DonationPage(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    items: List[DonationResponse]
+    next_cursor: str | None
+
+# Built once at import; list endpoints serialize straight to JSON bytes with these
+donation_list_adapter = TypeAdapter(List[DonationResponse])
+donation_page_adapter = TypeAdapter(DonationPage)
 
 class PayPalOrderResponse(BaseModel):
     order_id: str
@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from typing import List
+
+class LeaderboardEntry(BaseModel):
+    rank: int
+    user_id: int
+    name: str | None
+    total_donated: int
+
+class LeaderboardPage(BaseModel):
+    items: List[LeaderboardEntry]
+    total_donors: int
+    next_offset: int | None
+
+class PlatformStats(BaseModel):
+    total_raised: int
+    donations: int
+    donors: int
@@ -23,8 +23,11 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     id: Optional[int] = None
+    exp: Optional[int] = None
 
 
 class VerifyOtp(BaseModel):
     email: EmailStr
-    otp: str
\ No newline at end of file
+    otp: str
+class ResendOtp(BaseModel):
+    email: EmailStr
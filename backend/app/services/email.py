@@ -1,17 +1,15 @@
-import smtplib
 from email.message import EmailMessage
-import os
 from ..core.config import settings
-from .otp import generate_otp
+from .outbox import email_outbox
 
 def send_otp_email(to_email: str, otp: str):
-    try:
-        msg = EmailMessage()
-        msg["Subject"] = "Your One-Time Password (OTP)"
-        msg["From"] = settings.from_email
-        msg["To"] = to_email
-        msg.set_content(
-            f"""Hello,
+    """Queue the OTP email; delivery happens in the background outbox"""
+    msg = EmailMessage()
+    msg["Subject"] = "Your One-Time Password (OTP)"
+    msg["From"] = settings.from_email
+    msg["To"] = to_email
+    msg.set_content(
+        f"""Hello,
 
         Your One-Time Password (OTP) is:
 
@@ -24,27 +22,18 @@ def send_otp_email(to_email: str, otp: str):
         Best regards,
         The GiveHub Team
         """
-        )
+    )
 
-        with smtplib.SMTP(settings.smtp_host, settings.smtp_port) as server:
-            server.starttls()
-            server.login(settings.smtp_user, settings.smtp_pass)
-            server.send_message(msg)
-
-        print("✅ OTP email sent")
-
-    except Exception as e:
-        print("❌ Email failed:", e)
-        raise
+    email_outbox.enqueue(msg)
 
 def send_payment_done_email(to_email: str, amount: int):
-    try:
-        msg = EmailMessage()
-        msg["Subject"] = "Thank You for Your Donation"
-        msg["From"] = settings.from_email
-        msg["To"] = to_email
-        msg.set_content(
-            f"""Hello,
+    """Queue the donation acknowledgement email"""
+    msg = EmailMessage()
+    msg["Subject"] = "Thank You for Your Donation"
+    msg["From"] = settings.from_email
+    msg["To"] = to_email
+    msg.set_content(
+        f"""Hello,
 
         Thank you for your generosity! We have successfully received your donation of ${amount}.
 
@@ -55,15 +44,6 @@ def send_payment_done_email(to_email: str, amount: int):
         With gratitude,
         The GiveHub Team
         """
-        )
-
+    )
 
-        with smtplib.SMTP(settings.smtp_host, settings.smtp_port) as server:
-            server.starttls()
-            server.login(settings.smtp_user, settings.smtp_pass)
-            server.send_message(msg)
-        
-        print("✅ Acknowledgement email sent")
-    except Exception as e:
-        print("❌ Acknowledgement email failed", e)
-        raise
+    email_outbox.enqueue(msg)
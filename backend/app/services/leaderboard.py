@@ -0,0 +1,157 @@
+import logging
+import uuid
+from typing import List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.redis import get_redis
+from ..db.models import Donation, User
+
+logger = logging.getLogger(__name__)
+
+DONORS_KEY = "leaderboard:donors"    # zset: user id -> total donated
+NAMES_KEY = "leaderboard:names"      # hash: user id -> display name
+TOTALS_KEY = "leaderboard:totals"    # hash: raised, donations
+REBUILD_LOCK_KEY = "leaderboard:rebuild:lock"
+
+REBUILD_BATCH = 1000
+REBUILD_LOCK_TTL_MS = 10 * 60 * 1000
+
+# delete the lock only if it still holds our token (it may have expired and been retaken)
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class Leaderboard:
+    """
+    Donor leaderboard and platform totals kept in Redis.
+
+    Settlements and refunds apply their delta incrementally (see
+    SettlementService), so reads never touch the database. ``rebuild``
+    recomputes everything from the DB for a cold Redis or to repair drift.
+    """
+
+    async def record(self, user_id: int, name: Optional[str], delta: int) -> None:
+        """Apply one settled (positive ``delta``) or refunded (negative) donation"""
+        try:
+            pipe = get_redis().pipeline(transaction=True)
+            pipe.zincrby(DONORS_KEY, delta, str(user_id))
+            if name:
+                pipe.hset(NAMES_KEY, str(user_id), name)
+            # fully refunded donors drop off the board
+            pipe.zremrangebyscore(DONORS_KEY, "-inf", 0)
+            pipe.hincrby(TOTALS_KEY, "raised", delta)
+            pipe.hincrby(TOTALS_KEY, "donations", 1 if delta > 0 else -1)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to update leaderboard for user {user_id}: {e}")
+
+    async def top(self, offset: int, limit: int) -> tuple[List[dict], int]:
+        """One page of donors by total, highest first, and the number of donors"""
+        redis = get_redis()
+        pipe = redis.pipeline(transaction=False)
+        pipe.zrevrange(DONORS_KEY, offset, offset + limit - 1, withscores=True)
+        pipe.zcard(DONORS_KEY)
+        rows, donors = await pipe.execute()
+
+        names = await redis.hmget(NAMES_KEY, [user_id for user_id, _ in rows]) if rows else []
+        entries = [
+            {
+                "rank": offset + i + 1,
+                "user_id": int(user_id),
+                "name": name,
+                "total_donated": int(score),
+            }
+            for i, ((user_id, score), name) in enumerate(zip(rows, names))
+        ]
+        return entries, donors
+
+    async def stats(self) -> dict:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.hgetall(TOTALS_KEY)
+        pipe.zcard(DONORS_KEY)
+        totals, donors = await pipe.execute()
+        return {
+            "total_raised": int(totals.get("raised", 0)),
+            "donations": int(totals.get("donations", 0)),
+            "donors": donors,
+        }
+
+    async def ensure_built(self, db: AsyncSession) -> None:
+        """Rebuild from the DB if Redis has nothing (fresh instance or flushed)"""
+        redis = get_redis()
+        if await redis.exists(TOTALS_KEY):
+            return
+        if await redis.exists(REBUILD_LOCK_KEY):
+            logger.info("Leaderboard rebuild already running elsewhere, skipping")
+            return
+        await self.rebuild(db)
+
+    async def rebuild(self, db: AsyncSession) -> Optional[dict]:
+        """
+        Recompute the leaderboard and totals from the database.
+
+        Everything is written under temporary keys and swapped in with
+        RENAME, so readers never see a half-built board. Only one rebuild
+        runs at a time (a ``SET NX PX`` lock); returns None if another one
+        holds it. Settlements that land while the rebuild is running may
+        be missed; running it again picks them up.
+        """
+        redis = get_redis()
+        token = uuid.uuid4().hex
+        if not await redis.set(REBUILD_LOCK_KEY, token, nx=True, px=REBUILD_LOCK_TTL_MS):
+            logger.info("Leaderboard rebuild already running, skipping")
+            return None
+
+        # unique per run, so a run that outlives its lock can't clobber the next one
+        tmp_keys = [f"{key}:rebuild:{token}" for key in (DONORS_KEY, NAMES_KEY, TOTALS_KEY)]
+        try:
+            return await self._rebuild(db, *tmp_keys)
+        finally:
+            try:
+                await redis.delete(*tmp_keys)
+                await redis.eval(RELEASE_LOCK_SCRIPT, 1, REBUILD_LOCK_KEY, token)
+            except Exception as e:
+                logger.warning(f"Failed to clean up after leaderboard rebuild: {e}")
+
+    async def _rebuild(self, db: AsyncSession, tmp_donors: str, tmp_names: str, tmp_totals: str) -> dict:
+        redis = get_redis()
+        raised, donations = (await db.execute(
+            select(func.coalesce(func.sum(Donation.amount), 0), func.count(Donation.id))
+            .where(Donation.status.is_(True))
+        )).one()
+
+        donors = 0
+        result = await db.stream(
+            select(User.id, User.name, User.total_donated)
+            .where(User.total_donated > 0)
+            .execution_options(yield_per=REBUILD_BATCH)
+        )
+        async for batch in result.partitions():
+            pipe = redis.pipeline(transaction=False)
+            pipe.zadd(tmp_donors, {str(user_id): total for user_id, _, total in batch})
+            pipe.hset(tmp_names, mapping={str(user_id): name for user_id, name, _ in batch})
+            await pipe.execute()
+            donors += len(batch)
+
+        pipe = redis.pipeline(transaction=True)
+        pipe.hset(tmp_totals, mapping={"raised": int(raised), "donations": donations})
+        pipe.rename(tmp_totals, TOTALS_KEY)
+        if donors:
+            pipe.rename(tmp_donors, DONORS_KEY)
+            pipe.rename(tmp_names, NAMES_KEY)
+        else:
+            pipe.delete(DONORS_KEY, NAMES_KEY)
+        await pipe.execute()
+
+        summary = {"total_raised": int(raised), "donations": donations, "donors": donors}
+        logger.info(f"Leaderboard rebuilt: {summary}")
+        return summary
+
+
+leaderboard = Leaderboard()
@@ -0,0 +1,83 @@
+import asyncio
+import logging
+from typing import Any, Dict
+
+from ..core.cache import TTLCache, invalidation_bus
+from ..core.config import settings
+from .paypal_service import paypal_service
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATES = frozenset({"COMPLETED", "VOIDED"})
+
+
+class OrderStatusCache:
+    """
+    Per-process cache of PayPal order details for the status polling endpoint.
+
+    Orders still in progress are kept for ``order_status_ttl`` seconds,
+    COMPLETED / VOIDED ones for ``order_status_terminal_ttl``. Concurrent
+    misses for one order share a single upstream lookup. Capture, the
+    webhooks and reconciliation call ``invalidate`` once they've changed an
+    order, which also reaches the other workers through the invalidation bus.
+    """
+
+    def __init__(self):
+        self.orders = TTLCache(settings.order_status_cache_size, settings.order_status_ttl)
+        self._fetches: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.shared = 0
+        self.misses = 0
+        invalidation_bus.register("order", self._drop)
+
+    async def get(self, order_id: str) -> Dict[str, Any]:
+        order = self.orders.get(order_id)
+        if order is not None:
+            self.hits += 1
+            return order
+
+        task = self._fetches.get(order_id)
+        if task is None or task.done():
+            self.misses += 1
+            task = asyncio.ensure_future(self._fetch(order_id))
+            self._fetches[order_id] = task
+            task.add_done_callback(lambda done: self._forget(order_id, done))
+        else:
+            self.shared += 1
+
+        # shield so one poller going away doesn't cancel the lookup for the others
+        return await asyncio.shield(task)
+
+    async def _fetch(self, order_id: str) -> Dict[str, Any]:
+        order = await paypal_service.get_order_details(order_id)
+        # an invalidation that arrived mid-flight removed us from _fetches: don't store what may be stale
+        if self._fetches.get(order_id) is asyncio.current_task():
+            ttl = settings.order_status_terminal_ttl if order.get("status") in TERMINAL_STATES else None
+            self.orders.put(order_id, order, ttl)
+        return order
+
+    def _forget(self, order_id: str, task: asyncio.Task) -> None:
+        if self._fetches.get(order_id) is task:
+            del self._fetches[order_id]
+
+    def _drop(self, order_id: str) -> None:
+        self.orders.pop(order_id)
+        self._fetches.pop(order_id, None)
+
+    async def invalidate(self, order_id: str) -> None:
+        """Call after changing the order at PayPal or settling it here"""
+        self._drop(order_id)
+        await invalidation_bus.publish("order", order_id)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.shared + self.misses
+        return {
+            "hits": self.hits,
+            "shared": self.shared,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.shared) / lookups if lookups else 0.0,
+            "size": len(self.orders),
+        }
+
+
+order_status_cache = OrderStatusCache()
@@ -1,17 +1,130 @@
-from redis.asyncio import Redis
-import random
+import enum
+import logging
+import secrets
+from typing import Optional
+
+import redis.asyncio
 from ..core.config import settings
-import asyncio
-import redis
+from ..core.redis import async_client_class
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1] code, KEYS[2] failed-attempt counter; ARGV[1] submitted code, ARGV[2] max attempts.
+# Returns 1 verified, 0 wrong code, -1 no code (expired), -2 too many attempts (code burned).
+VERIFY_SCRIPT = """
+local stored = redis.call('GET', KEYS[1])
+if not stored then
+    return -1
+end
+if stored == ARGV[1] then
+    redis.call('DEL', KEYS[1], KEYS[2])
+    return 1
+end
+local attempts = redis.call('INCR', KEYS[2])
+if attempts == 1 then
+    local ttl = redis.call('PTTL', KEYS[1])
+    if ttl > 0 then
+        redis.call('PEXPIRE', KEYS[2], ttl)
+    end
+end
+if attempts >= tonumber(ARGV[2]) then
+    redis.call('DEL', KEYS[1], KEYS[2])
+    return -2
+end
+return 0
+"""
+
+
+class OTPResult(enum.IntEnum):
+    VERIFIED = 1
+    INVALID = 0
+    EXPIRED = -1
+    LOCKED = -2
 
-redis_client = Redis(host=settings.redis_host, port=settings.redis_port, decode_responses=True)
 
 def generate_otp():
-    return str(random.randint(100000, 999999))
+    return f"{secrets.randbelow(900000) + 100000}"
+
+
+class OTPStore:
+    """
+    Email verification codes in Redis.
+
+    Verification is a single Lua round trip that compares the code,
+    counts failed attempts and deletes the code on success (or once
+    ``otp_max_attempts`` is reached), so a code can't be used twice or
+    brute-forced. Issuing a code writes it, resets the counter and sets
+    the resend cooldown in one pipelined MULTI.
+
+    Uses its own authenticated pool, opened in the app lifespan.
+    """
+
+    def __init__(self):
+        self._pool: Optional[redis.asyncio.ConnectionPool] = None
+        self._client: Optional[redis.asyncio.Redis] = None
+        self._verify = None
+
+    @property
+    def client(self) -> redis.asyncio.Redis:
+        if self._client is None:
+            self._pool = redis.asyncio.ConnectionPool(
+                host=settings.redis_host,
+                port=settings.redis_port,
+                username=settings.redis_user or None,
+                password=settings.redis_pass or None,
+                max_connections=settings.otp_redis_max_connections,
+                socket_timeout=settings.otp_redis_timeout,
+                socket_connect_timeout=settings.otp_redis_timeout,
+                health_check_interval=30,
+                retry_on_timeout=True,
+                decode_responses=True,
+            )
+            self._client = async_client_class()(connection_pool=self._pool)
+            self._verify = self._client.register_script(VERIFY_SCRIPT)
+        return self._client
+
+    async def start(self) -> None:
+        try:
+            await self.client.ping()
+            # cache the script server-side so the first verification is an EVALSHA
+            await self.client.script_load(VERIFY_SCRIPT)
+        except Exception as e:
+            logger.warning(f"OTP store could not reach Redis on startup: {e}")
+
+    async def stop(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            await self._pool.aclose()
+            self._client = None
+            self._pool = None
+            self._verify = None
+
+    @staticmethod
+    def _keys(email: str):
+        return f"otp:{email}", f"otp:attempts:{email}", f"otp:cooldown:{email}"
+
+    async def store(self, email: str, otp: str) -> None:
+        code_key, attempts_key, cooldown_key = self._keys(email)
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.set(code_key, otp, ex=int(settings.otp_exp))
+            pipe.delete(attempts_key)
+            pipe.set(cooldown_key, 1, ex=settings.otp_resend_cooldown)
+            await pipe.execute()
+
+    async def cooldown_remaining(self, email: str) -> int:
+        """Seconds until another code may be sent to ``email`` (0 if it may be sent now)"""
+        ttl = await self.client.ttl(self._keys(email)[2])
+        return max(ttl, 0)
+
+    async def verify(self, email: str, otp: str) -> OTPResult:
+        code_key, attempts_key, _ = self._keys(email)
+        client = self.client  # also registers the script on first use
+        result = await self._verify(keys=[code_key, attempts_key], args=[otp, settings.otp_max_attempts], client=client)
+        return OTPResult(int(result))
+
+
+otp_store = OTPStore()
+
 
 async def store_otp(email: str, otp: str):
-    await redis_client.setex(
-        f"otp:{email}",
-        int(settings.otp_exp),
-        otp
-    )
\ No newline at end of file
+    await otp_store.store(email, otp)
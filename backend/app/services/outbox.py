@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import smtplib
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from email.message import EmailMessage
+from typing import Dict, List, Optional
+
+from ..core.config import settings
+from ..core.metrics import smtp_latency
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OutboxMessage:
+    message: EmailMessage
+    attempts: int = 0
+    last_error: Optional[str] = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class SMTPConnection:
+    """An authenticated SMTP connection that is kept open between batches"""
+
+    def __init__(self):
+        self._server: Optional[smtplib.SMTP] = None
+        self.last_used = 0.0
+
+    @property
+    def is_open(self) -> bool:
+        return self._server is not None
+
+    def open(self) -> None:
+        server = smtplib.SMTP(settings.smtp_host, settings.smtp_port, timeout=settings.smtp_timeout)
+        try:
+            if settings.smtp_starttls:
+                server.starttls()
+            if settings.smtp_user:
+                server.login(settings.smtp_user, settings.smtp_pass)
+        except Exception:
+            server.close()
+            raise
+        self._server = server
+
+    def close(self) -> None:
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except Exception:
+            self._server.close()
+        self._server = None
+
+    def send(self, message: EmailMessage) -> None:
+        """Send one message, reconnecting once if the server dropped us"""
+        if self._server is None:
+            self.open()
+        try:
+            self._server.send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            self._server = None
+            self.open()
+            self._server.send_message(message)
+        self.last_used = time.monotonic()
+
+
+class EmailOutbox:
+    """
+    In-process email outbox.
+
+    Handlers enqueue messages and return immediately. A small pool of
+    workers drains the queue in batches, each over its own persistent
+    SMTP connection, retrying failures with exponential backoff and
+    parking messages that keep failing on a dead-letter list.
+    """
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._retries: Dict[asyncio.Task, OutboxMessage] = {}
+        self.dead_letters: deque = deque(maxlen=settings.email_dead_letter_size)
+        self.sent = 0
+        self.failed = 0
+
+    @property
+    def queue(self) -> asyncio.Queue:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=settings.email_queue_size)
+        return self._queue
+
+    def enqueue(self, message: EmailMessage) -> None:
+        try:
+            self.queue.put_nowait(OutboxMessage(message))
+        except asyncio.QueueFull:
+            logger.error(f"Email outbox full, dead-lettering message to {message['To']}")
+            self.dead_letters.append(OutboxMessage(message, last_error="outbox full"))
+
+    async def start(self) -> None:
+        if self._workers:
+            return
+        for i in range(settings.email_workers):
+            self._workers.append(asyncio.create_task(self._worker(i), name=f"email-outbox-{i}"))
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Give queued mail a chance to go out, then stop the workers"""
+        if not self._workers:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Email outbox stopped with {self.queue.qsize()} messages still queued")
+
+        # mail still waiting on a retry won't go out now; keep it with the dead letters
+        waiting = [item for task, item in self._retries.items() if not task.done()]
+        for item in waiting:
+            item.last_error = f"outbox stopped before retry ({item.last_error})"
+            self.dead_letters.append(item)
+        if waiting:
+            logger.warning(f"Email outbox stopped with {len(waiting)} messages awaiting retry, dead-lettered")
+
+        retries = list(self._retries)
+        for task in [*self._workers, *retries]:
+            task.cancel()
+        await asyncio.gather(*self._workers, *retries, return_exceptions=True)
+        self._workers.clear()
+        self._retries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.queue.qsize(),
+            "sent": self.sent,
+            "failed": self.failed,
+            "dead_letters": len(self.dead_letters),
+        }
+
+    async def _next_batch(self) -> List[OutboxMessage]:
+        batch = [await self.queue.get()]
+        while len(batch) < settings.email_batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    async def _worker(self, number: int) -> None:
+        connection = SMTPConnection()
+        try:
+            while True:
+                try:
+                    batch = await asyncio.wait_for(self._next_batch(), settings.smtp_idle_timeout)
+                except asyncio.TimeoutError:
+                    if connection.is_open:
+                        await asyncio.to_thread(connection.close)
+                    continue
+
+                try:
+                    failures = await asyncio.to_thread(self._send_batch, connection, batch)
+                finally:
+                    for _ in batch:
+                        self.queue.task_done()
+
+                for item in failures:
+                    self._retry_later(item)
+        finally:
+            connection.close()
+
+    def _send_batch(self, connection: SMTPConnection, batch: List[OutboxMessage]) -> List[OutboxMessage]:
+        failures = []
+        for item in batch:
+            start = time.perf_counter()
+            try:
+                connection.send(item.message)
+                smtp_latency.observe(time.perf_counter() - start, "sent")
+                self.sent += 1
+                logger.info(f"Email '{item.message['Subject']}' sent to {item.message['To']}")
+            except Exception as e:
+                smtp_latency.observe(time.perf_counter() - start, "failed")
+                # the connection may be in an unknown state, start fresh next time
+                connection.close()
+                item.attempts += 1
+                item.last_error = str(e)
+                failures.append(item)
+        return failures
+
+    def _retry_later(self, item: OutboxMessage) -> None:
+        self.failed += 1
+        if item.attempts >= settings.email_max_retries:
+            logger.error(
+                f"Email to {item.message['To']} failed {item.attempts} times, dead-lettering: {item.last_error}"
+            )
+            self.dead_letters.append(item)
+            return
+
+        delay = settings.email_retry_backoff * (2 ** (item.attempts - 1))
+        logger.warning(f"Email to {item.message['To']} failed ({item.last_error}), retrying in {delay:.1f}s")
+
+        async def requeue():
+            await asyncio.sleep(delay)
+            try:
+                self.queue.put_nowait(item)
+            except asyncio.QueueFull:
+                item.last_error = "outbox full"
+                self.dead_letters.append(item)
+
+        task = asyncio.create_task(requeue())
+        self._retries[task] = item
+        task.add_done_callback(lambda done: self._retries.pop(done, None))
+
+
+email_outbox = EmailOutbox()
@@ -1,8 +1,42 @@
 import httpx
 import base64
+import asyncio
+import time
+import logging
+import re
 from typing import Dict, Any, Optional
 from fastapi import HTTPException
 from ..core.config import settings
+from ..core.metrics import paypal_hedges, paypal_latency, paypal_rejections
+from ..core.resilience import AdaptiveLimiter, CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+_ORDER_ID = re.compile(r"/orders/[^/]+")
+
+# (method, endpoint) -> operation, which picks the deadline (paypal_timeout_<operation>)
+OPERATIONS = {
+    ("POST", "/v1/oauth2/token"): "token",
+    ("POST", "/v2/checkout/orders"): "create",
+    ("POST", "/v2/checkout/orders/{id}/capture"): "capture",
+    ("GET", "/v2/checkout/orders/{id}"): "details",
+    ("POST", "/v1/notifications/verify-webhook-signature"): "verify",
+}
+
+
+class PayPalUnavailable(HTTPException):
+    """PayPal calls are being shed (circuit open or concurrency limit reached)"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(
+            status_code=503,
+            detail="Payment provider is temporarily unavailable, please try again shortly",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+def _healthy(response: httpx.Response) -> bool:
+    return response.status_code < 500 and response.status_code != 429
 
 class PayPalService:
     def __init__(self):
@@ -10,45 +44,237 @@ class PayPalService:
         self.client_id = settings.paypal_client_id
         self.client_secret = settings.paypal_client_secret
         self._access_token:  Optional[str] = None
-    
-    async def get_access_token(self) -> str:
-        """Get PayPal OAuth access token"""
+        self._token_expires_at: float = 0.0
+        self._token_refresh: Optional[asyncio.Task] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self.limiter = AdaptiveLimiter(
+            initial=settings.paypal_limit_initial,
+            min_limit=settings.paypal_limit_min,
+            max_limit=settings.paypal_limit_max,
+            latency_target=settings.paypal_timeout * settings.paypal_latency_target_ratio,
+        )
+        self.breaker = CircuitBreaker(
+            "paypal",
+            failure_rate=settings.paypal_breaker_failure_rate,
+            min_calls=settings.paypal_breaker_min_calls,
+            window=settings.paypal_breaker_window,
+            reset_timeout=settings.paypal_breaker_reset_timeout,
+            half_open_calls=settings.paypal_breaker_half_open_calls,
+        )
+
+    async def startup(self) -> None:
+        """Open the shared, pooled HTTP client (called from the app lifespan)"""
+        if self._client is not None:
+            return
+
+        http2 = settings.paypal_http2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("h2 is not installed, falling back to HTTP/1.1 for PayPal")
+                http2 = False
+
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.paypal_max_connections,
+                max_keepalive_connections=settings.paypal_max_keepalive_connections,
+                keepalive_expiry=settings.paypal_keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(
+                settings.paypal_timeout,
+                connect=settings.paypal_connect_timeout,
+            ),
+        )
+
+    async def shutdown(self) -> None:
+        """Close the shared HTTP client and drop the cached token"""
+        if self._token_refresh is not None and not self._token_refresh.done():
+            self._token_refresh.cancel()
+        self._token_refresh = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self._access_token = None
+        self._token_expires_at = 0.0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            raise RuntimeError("PayPalService.startup() has not been called")
+        return self._client
+
+    def _token_is_fresh(self) -> bool:
+        return (
+            self._access_token is not None
+            and time.monotonic() < self._token_expires_at - settings.paypal_token_refresh_margin
+        )
+
+    async def _fetch_access_token(self) -> str:
         auth = base64.b64encode(
             f"{self.client_id}:{self.client_secret}".encode()
         ).decode()
-        
+
         headers = {
             "Authorization": f"Basic {auth}",
             "Content-Type":  "application/x-www-form-urlencoded"
         }
-        
+
         data = "grant_type=client_credentials"
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/v1/oauth2/token",
-                headers=headers,
-                content=data
+
+        response = await self._send(
+            "POST",
+            "/v1/oauth2/token",
+            headers=headers,
+            content=data
+        )
+
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=response.status_code,
+                detail="Failed to get PayPal access token"
             )
-            
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail="Failed to get PayPal access token"
-                )
-            
-            self._access_token = response.json()["access_token"]
+
+        body = response.json()
+        self._access_token = body["access_token"]
+        self._token_expires_at = time.monotonic() + int(body.get("expires_in", 0))
+        return self._access_token
+
+    async def get_access_token(self, force_refresh: bool = False) -> str:
+        """
+        Get PayPal OAuth access token.
+
+        The token is cached until shortly before ``expires_in``. Concurrent
+        callers that find it stale share a single in-flight refresh.
+        """
+        if not force_refresh and self._token_is_fresh():
             return self._access_token
-    
-    async def create_order(self, amount: float, currency: str = "USD") -> Dict[str, Any]: 
-        if not self._access_token:
-            await self.get_access_token()
-        
+
+        if self._token_refresh is None or self._token_refresh.done():
+            self._token_refresh = asyncio.ensure_future(self._fetch_access_token())
+
+        # shield so a cancelled caller doesn't cancel the refresh for everyone else
+        return await asyncio.shield(self._token_refresh)
+
+    def _invalidate_token(self, token: str) -> None:
+        if self._access_token == token:
+            self._access_token = None
+            self._token_expires_at = 0.0
+
+    async def _send(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        One HTTP call on the shared client, timed per endpoint.
+
+        Calls to the PayPal API (relative URLs) also go through the adaptive
+        concurrency limit and the circuit breaker, which refuse with a 503
+        rather than letting requests pile up behind a slow PayPal, and get
+        their operation's deadline (a 504 when it passes).
+        """
+        endpoint = _ORDER_ID.sub("/orders/{id}", url) if url.startswith("/") else "external"
+        if endpoint == "external":
+            return await self._timed(method, url, endpoint, **kwargs)
+
+        if not self.limiter.try_acquire():
+            paypal_rejections.inc("concurrency_limit")
+            raise PayPalUnavailable(retry_after=1)
+        if not self.breaker.allow():
+            self.limiter.release()
+            paypal_rejections.inc("circuit_open")
+            raise PayPalUnavailable(retry_after=self.breaker.retry_after())
+
+        operation = OPERATIONS.get((method, endpoint))
+        deadline = getattr(settings, f"paypal_timeout_{operation}", settings.paypal_timeout)
+        start = time.perf_counter()
+        ok = False
+        try:
+            response = await asyncio.wait_for(self._timed(method, url, endpoint, **kwargs), deadline)
+            ok = _healthy(response)
+            return response
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail=f"PayPal did not answer within {deadline:g}s")
+        except asyncio.CancelledError:
+            # a hedge that lost, or a client that went away: says nothing about PayPal
+            self.limiter.release()
+            self.breaker.cancel()
+            start = None
+            raise
+        finally:
+            if start is not None:
+                self.limiter.release(time.perf_counter() - start, ok, deadline * settings.paypal_latency_target_ratio)
+                self.breaker.record(ok)
+
+    async def _timed(self, method: str, url: str, endpoint: str, **kwargs) -> httpx.Response:
+        start = time.perf_counter()
+        status = "error"
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            status = str(response.status_code)
+            return response
+        finally:
+            paypal_latency.observe(time.perf_counter() - start, method, endpoint, status)
+
+    async def _hedged_request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        ``_request`` for idempotent reads: if the first attempt hasn't answered
+        within ``paypal_hedge_delay``, or failed, a second one is raced
+        against it and the first healthy response wins. No hedge is sent
+        while the circuit isn't closed or the concurrency limit is reached.
+        """
+        first = asyncio.ensure_future(self._request(method, url, **kwargs))
+        tasks = [first]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=settings.paypal_hedge_delay)
+            if done and first.exception() is None and _healthy(first.result()):
+                return first.result()
+            if self.breaker.state != CircuitBreaker.CLOSED or not self.limiter.has_headroom():
+                return await first
+
+            paypal_hedges.inc("retry" if done else "hedge")
+            second = asyncio.ensure_future(self._request(method, url, **kwargs))
+            tasks.append(second)
+            pending = {second} if done else {first, second}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and _healthy(task.result()):
+                        if task is second:
+                            paypal_hedges.inc("won")
+                        return task.result()
+            # nothing healthy: prefer a response over an exception, the latest first
+            for task in (second, first):
+                if task.exception() is None:
+                    return task.result()
+            return first.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send an authenticated request, refreshing the token once on a 401"""
+        headers = kwargs.pop("headers", {})
+        token = await self.get_access_token()
+        response = await self._send(
+            method, url, headers={**headers, "Authorization": f"Bearer {token}"}, **kwargs
+        )
+
+        if response.status_code == 401:
+            logger.info("PayPal rejected the cached access token, refreshing")
+            self._invalidate_token(token)
+            token = await self.get_access_token()
+            response = await self._send(
+                method, url, headers={**headers, "Authorization": f"Bearer {token}"}, **kwargs
+            )
+
+        return response
+
+    async def create_order(self, amount: float, currency: str = "USD") -> Dict[str, Any]:
         headers = {
             "Content-Type": "application/json",
-            "Authorization":  f"Bearer {self._access_token}"
         }
-        
+
         payload = {
             "intent": "CAPTURE",
             "purchase_units": [{
@@ -68,68 +294,69 @@ class PayPalService:
                 "cancel_url": "https://example.com/cancel"
             }
         }
-        
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                f"{self.base_url}/v2/checkout/orders",
-                headers=headers,
-                json=payload
+
+        response = await self._request(
+            "POST",
+            "/v2/checkout/orders",
+            headers=headers,
+            json=payload
+        )
+
+        if response.status_code not in [200, 201]:
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=f"Failed to create PayPal order:  {response.text}"
             )
-            
-            if response.status_code not in [200, 201]:  
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"Failed to create PayPal order:  {response.text}"
-                )
-            
-            return response.json()
-    
+
+        return response.json()
+
     async def capture_order(self, order_id: str) -> Dict[str, Any]:
         """Capture/Complete a PayPal order"""
-        if not self._access_token:
-            await self.get_access_token()
-        
         headers = {
             "Content-Type":  "application/json",
-            "Authorization": f"Bearer {self._access_token}"
         }
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/v2/checkout/orders/{order_id}/capture",
-                headers=headers
+
+        response = await self._request(
+            "POST",
+            f"/v2/checkout/orders/{order_id}/capture",
+            headers=headers
+        )
+
+        if response.status_code not in [200, 201]:
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=f"Failed to capture order: {response.text}"
             )
-            
-            if response.status_code not in [200, 201]:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"Failed to capture order: {response.text}"
-                )
-            
-            return response.json()
-    
+
+        return response.json()
+
     async def get_order_details(self, order_id: str) -> Dict[str, Any]:
         """Get order details"""
-        if not self._access_token:
-            await self.get_access_token()
-        
-        headers = {
-            "Authorization": f"Bearer {self._access_token}"
-        }
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/v2/checkout/orders/{order_id}",
-                headers=headers
+        response = await self._hedged_request(
+            "GET",
+            f"/v2/checkout/orders/{order_id}"
+        )
+
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=response.status_code,
+                detail="Failed to get order details"
             )
-            
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail="Failed to get order details"
-                )
-            
-            return response. json()
+
+        return response.json()
+
+    async def verify_webhook_signature(self, verification_data: Dict[str, Any]) -> httpx.Response:
+        """Ask PayPal to verify a webhook transmission; the caller interprets the response"""
+        return await self._request(
+            "POST",
+            "/v1/notifications/verify-webhook-signature",
+            json=verification_data,
+            headers={"Content-Type": "application/json"}
+        )
+
+    async def fetch_cert(self, cert_url: str) -> httpx.Response:
+        """Download a webhook signing certificate (an absolute URL on PayPal's cert host)"""
+        return await self._send("GET", cert_url)
 
 # Singleton instance
-paypal_service = PayPalService()
\ No newline at end of file
+paypal_service = PayPalService()
@@ -0,0 +1,211 @@
+import asyncio
+import logging
+import time
+from contextlib import aclosing
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, List, Optional, Sequence
+
+from fastapi import HTTPException
+from sqlalchemy import Row, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import settings
+from ..db.database import AsyncSessionLocal, get_async_engine
+from ..db.models import Donation, JobCheckpoint
+from .paypal_service import paypal_service
+from .settlement import settlement_service
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT = "reconcile_donations"
+
+SETTLE, EXPIRE, KEEP, ERROR = "settle", "expire", "keep", "error"
+
+
+class RateBudget:
+    """Token bucket: at most ``rate`` acquisitions per second, bursts up to ``burst``"""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.capacity = float(burst or max(1, int(rate)))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+@dataclass
+class ReconcileSummary:
+    scanned: int = 0
+    settled: int = 0
+    expired: int = 0
+    pending: int = 0
+    errors: int = 0
+    paypal_calls: int = 0
+    resumed_from: int = 0
+    finished: bool = False
+
+
+class DonationReconciler:
+    """
+    Sweeps donations still pending after ``reconcile_min_age`` seconds
+    (closed tab before capture, lost webhook) and asks PayPal what
+    happened to each order.
+
+    Pending rows are streamed by id in batches of ``reconcile_batch_size``
+    (a server-side cursor on PostgreSQL, keyset pages elsewhere). Each batch's orders are looked up
+    concurrently, bounded by a semaphore (``reconcile_concurrency``) and
+    a token bucket (``reconcile_rate`` calls per second). COMPLETED
+    orders are settled in bulk; voided, vanished or stale ones
+    (``reconcile_expire_after``) get ``expired_at``. After every batch
+    the last id is written to ``job_checkpoints``, so an interrupted run
+    picks up where it stopped; a run that reaches the end resets it.
+    """
+
+    async def run(self, max_calls: Optional[int] = None, restart: bool = False) -> ReconcileSummary:
+        summary = ReconcileSummary()
+        semaphore = asyncio.Semaphore(settings.reconcile_concurrency)
+        budget = RateBudget(settings.reconcile_rate)
+        now = datetime.now(timezone.utc)
+        cutoff = now - timedelta(seconds=settings.reconcile_min_age)
+
+        async with AsyncSessionLocal() as writer:
+            start = 0 if restart else await self._load_checkpoint(writer)
+            summary.resumed_from = start
+
+            # aclosing: stopping at the budget closes the reader session and its cursor right away
+            async with aclosing(self._pending(start, cutoff)) as batches:
+                async for batch in batches:
+                    over_budget = max_calls is not None and summary.paypal_calls + len(batch) > max_calls
+                    if over_budget:
+                        batch = batch[:max_calls - summary.paypal_calls]
+                    if batch:
+                        summary.paypal_calls += len(batch)
+                        outcomes = await asyncio.gather(*(self._check(row, now, semaphore, budget) for row in batch))
+                        await self._apply(writer, batch, outcomes, summary)
+                    if over_budget:
+                        logger.info(f"Reconciliation stopped at its budget of {max_calls} PayPal calls")
+                        break
+                else:
+                    # the stream ran out, so every pending donation was seen
+                    summary.finished = True
+                    await self._save_checkpoint(writer, 0)
+
+        logger.info(f"Reconciliation {'finished' if summary.finished else 'paused'}: {asdict(summary)}")
+        return summary
+
+    async def _pending(self, start: int, cutoff: datetime) -> AsyncIterator[Sequence[Row]]:
+        """Pending donations after id ``start``, in id order, one batch at a time"""
+        query = (
+            select(Donation.id, Donation.payment_reference, Donation.amount, Donation.created_at)
+            .where(
+                Donation.status.is_(False),
+                Donation.expired_at.is_(None),
+                Donation.created_at < cutoff,
+            )
+            .order_by(Donation.id)
+        )
+        batch_size = settings.reconcile_batch_size
+
+        if get_async_engine().dialect.name == "postgresql":
+            # a server-side cursor in its own read session; MVCC lets the writer commit alongside it
+            async with AsyncSessionLocal() as reader:
+                result = await reader.stream(
+                    query.where(Donation.id > start).execution_options(yield_per=batch_size)
+                )
+                try:
+                    async for batch in result.partitions():
+                        yield batch
+                finally:
+                    await result.close()
+            return
+
+        # SQLite can't commit while another connection holds a read cursor open: page by id instead
+        while True:
+            async with AsyncSessionLocal() as reader:
+                batch = (await reader.execute(query.where(Donation.id > start).limit(batch_size))).all()
+            if not batch:
+                return
+            yield batch
+            start = batch[-1][0]
+
+    async def _check(self, row, now: datetime, semaphore: asyncio.Semaphore, budget: RateBudget) -> str:
+        donation_id, order_id, amount, created_at = row
+        async with semaphore:
+            await budget.acquire()
+            try:
+                order = await paypal_service.get_order_details(order_id)
+            except HTTPException as e:
+                if e.status_code == 404:
+                    return EXPIRE
+                logger.warning(f"Reconcile: PayPal lookup for donation {donation_id} failed ({e.status_code})")
+                return ERROR
+            except Exception as e:
+                logger.warning(f"Reconcile: PayPal lookup for donation {donation_id} failed: {e}")
+                return ERROR
+
+        status = order.get("status")
+        if status == "COMPLETED":
+            captured = self._captured_amount(order)
+            if captured is not None and abs(captured - float(amount)) > 0.01:
+                logger.error(f"Reconcile: donation {donation_id} expected {amount}, PayPal captured {captured}")
+                return ERROR
+            return SETTLE
+        if status == "VOIDED":
+            return EXPIRE
+
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        if now - created_at > timedelta(seconds=settings.reconcile_expire_after):
+            return EXPIRE
+        return KEEP
+
+    @staticmethod
+    def _captured_amount(order: dict) -> Optional[float]:
+        try:
+            return float(order["purchase_units"][0]["payments"]["captures"][0]["amount"]["value"])
+        except (KeyError, IndexError, TypeError, ValueError):
+            return None
+
+    async def _apply(self, db: AsyncSession, batch: Sequence[Row], outcomes: List[str], summary: ReconcileSummary) -> None:
+        to_settle = [row[1] for row, outcome in zip(batch, outcomes) if outcome == SETTLE]
+        to_expire = [row[0] for row, outcome in zip(batch, outcomes) if outcome == EXPIRE]
+
+        settled = await settlement_service.settle_many(db, to_settle)
+        if to_expire:
+            expired = await db.execute(
+                update(Donation)
+                .where(Donation.id.in_(to_expire), Donation.status.is_(False), Donation.expired_at.is_(None))
+                .values(expired_at=datetime.now(timezone.utc))
+            )
+            summary.expired += expired.rowcount
+        await self._save_checkpoint(db, batch[-1][0])
+
+        summary.scanned += len(batch)
+        summary.settled += len(settled)
+        summary.pending += outcomes.count(KEEP)
+        summary.errors += outcomes.count(ERROR)
+
+    @staticmethod
+    async def _load_checkpoint(db: AsyncSession) -> int:
+        position = await db.scalar(select(JobCheckpoint.position).where(JobCheckpoint.name == CHECKPOINT))
+        return position or 0
+
+    @staticmethod
+    async def _save_checkpoint(db: AsyncSession, position: int) -> None:
+        await db.merge(JobCheckpoint(name=CHECKPOINT, position=position))
+        await db.commit()
+
+
+reconciler = DonationReconciler()
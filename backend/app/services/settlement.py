@@ -0,0 +1,161 @@
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.etag import user_versions
+from ..core.principal_cache import principal_cache
+from ..db.models import Donation, User
+from .email import send_payment_done_email
+from .leaderboard import leaderboard
+from .order_status import order_status_cache
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Settlement:
+    """A donation whose status this call actually flipped"""
+    donation_id: int
+    user_id: int
+    amount: int
+    email: Optional[str]
+    name: Optional[str]
+
+
+class SettlementService:
+    """
+    Atomic donation settlement shared by capture and the PayPal webhooks.
+
+    The status flip is conditional (``WHERE status = false`` to settle,
+    ``= true`` to refund), so only one of a racing capture and webhook
+    gets a row back, and only that one moves ``users.total_donated``.
+    On PostgreSQL both updates go out as a single statement (the donation
+    UPDATE in a CTE feeding the users UPDATE); other databases run the
+    same two UPDATEs back to back in one transaction.
+    """
+
+    async def settle(self, db: AsyncSession, order_id: str, user_id: Optional[int] = None) -> Optional[Settlement]:
+        """Mark the donation for ``order_id`` completed; None if it already was (or doesn't exist)"""
+        settlement = await self._flip(db, order_id, completed=True, user_id=user_id)
+        if settlement is None:
+            return None
+
+        await db.commit()
+        await self._after_commit(settlement, order_id, completed=True)
+        if settlement.email:
+            send_payment_done_email(settlement.email, settlement.amount)
+        logger.info(f"Donation {settlement.donation_id} marked as completed")
+        return settlement
+
+    async def settle_many(self, db: AsyncSession, order_ids: Sequence[str]) -> List[Settlement]:
+        """
+        Settle a batch of orders in one transaction.
+
+        One conditional UPDATE flips every still-pending donation, one
+        executemany moves each owner's total by the sum of their flipped
+        amounts, and one SELECT fetches the owners for the follow-ups.
+        """
+        if not order_ids:
+            return []
+
+        flipped = (await db.execute(
+            update(Donation)
+            .where(Donation.payment_reference.in_(order_ids), Donation.status.is_(False))
+            .values(status=True, expired_at=None)
+            .returning(Donation.id, Donation.user_id, Donation.amount, Donation.payment_reference)
+        )).all()
+        if not flipped:
+            return []
+
+        totals = defaultdict(int)
+        for _, user_id, amount, _ in flipped:
+            totals[user_id] += amount
+        users = User.__table__
+        connection = await db.connection()
+        await connection.execute(
+            update(users)
+            .where(users.c.id == bindparam("owner_id"))
+            .values(total_donated=func.coalesce(users.c.total_donated, 0) + bindparam("delta")),
+            [{"owner_id": user_id, "delta": delta} for user_id, delta in totals.items()],
+        )
+        owners = {
+            user_id: (email, name)
+            for user_id, email, name in await db.execute(
+                select(User.id, User.email, User.name).where(User.id.in_(totals))
+            )
+        }
+        await db.commit()
+
+        settlements = []
+        for donation_id, user_id, amount, order_id in flipped:
+            settlement = Settlement(donation_id, user_id, amount, *owners.get(user_id, (None, None)))
+            settlements.append(settlement)
+            await self._after_commit(settlement, order_id, completed=True)
+            if settlement.email:
+                send_payment_done_email(settlement.email, settlement.amount)
+        logger.info(f"Settled {len(settlements)} donations in bulk")
+        return settlements
+
+    async def refund(self, db: AsyncSession, order_id: str) -> Optional[Settlement]:
+        """Reverse a completed donation; None if it wasn't completed"""
+        settlement = await self._flip(db, order_id, completed=False)
+        if settlement is None:
+            return None
+
+        await db.commit()
+        await self._after_commit(settlement, order_id, completed=False)
+        logger.info(f"Donation {settlement.donation_id} refunded")
+        return settlement
+
+    async def _flip(self, db: AsyncSession, order_id: str, completed: bool, user_id: Optional[int] = None) -> Optional[Settlement]:
+        values = {"status": completed}
+        if completed:
+            values["expired_at"] = None
+        flip = (
+            update(Donation)
+            .where(Donation.payment_reference == order_id, Donation.status.is_(not completed))
+            .values(**values)
+            .returning(Donation.id, Donation.user_id, Donation.amount)
+        )
+        if user_id is not None:
+            flip = flip.where(Donation.user_id == user_id)
+
+        if db.get_bind().dialect.name == "postgresql":
+            flipped = flip.cte("flipped")
+            delta = flipped.c.amount if completed else -flipped.c.amount
+            row = (await db.execute(
+                update(User)
+                .where(User.id == flipped.c.user_id)
+                .values(total_donated=func.coalesce(User.total_donated, 0) + delta)
+                .returning(flipped.c.id, flipped.c.user_id, flipped.c.amount, User.email, User.name)
+            )).first()
+            return Settlement(*row) if row else None
+
+        row = (await db.execute(flip)).first()
+        if row is None:
+            return None
+        donation_id, owner_id, amount = row
+        delta = amount if completed else -amount
+        user = (await db.execute(
+            update(User)
+            .where(User.id == owner_id)
+            .values(total_donated=func.coalesce(User.total_donated, 0) + delta)
+            .returning(User.email, User.name)
+        )).first()
+        email, name = user if user else (None, None)
+        return Settlement(donation_id, owner_id, amount, email, name)
+
+    async def _after_commit(self, settlement: Settlement, order_id: str, completed: bool) -> None:
+        """Side effects that must only happen once the settlement is durable"""
+        await order_status_cache.invalidate(order_id)
+        await principal_cache.invalidate(settlement.user_id)
+        await user_versions.bump(settlement.user_id)
+        delta = settlement.amount if completed else -settlement.amount
+        await leaderboard.record(settlement.user_id, settlement.name, delta)
+
+
+settlement_service = SettlementService()
@@ -0,0 +1,142 @@
+import asyncio
+import enum
+import logging
+from typing import Dict, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import settings
+from ..core.redis import get_redis
+from ..db.models import ProcessedWebhookEvent
+
+logger = logging.getLogger(__name__)
+
+
+class Claim(enum.Enum):
+    NEW = "new"                  # caller must process the event, then complete() or release()
+    DUPLICATE = "duplicate"      # already processed: acknowledge without doing anything
+    IN_PROGRESS = "in_progress"  # another delivery is being processed right now
+
+
+class WebhookEventStore:
+    """
+    Processed-event store keyed on the PayPal event id.
+
+    Redis holds ``webhook:event:<id>`` = processing|done with a TTL so
+    duplicates are recognised with one round trip; the
+    processed_webhook_events table is the durable fallback when Redis
+    has forgotten. Concurrent deliveries inside one worker share a
+    single future so only the first one is processed.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.received = 0
+        self.duplicates = 0
+        self.in_progress = 0
+
+    @staticmethod
+    def _key(event_id: str) -> str:
+        return f"webhook:event:{event_id}"
+
+    async def claim(self, event_id: str, db: AsyncSession, wait: bool = True) -> Claim:
+        """
+        Claim ``event_id`` for processing.
+
+        With ``wait`` a delivery that arrives while this worker is already
+        processing the event waits for that outcome; without it it returns
+        IN_PROGRESS straight away.
+        """
+        self.received += 1
+
+        inflight = self._inflight.get(event_id)
+        if inflight is not None:
+            if not wait:
+                return self._count(Claim.IN_PROGRESS)
+            processed = await asyncio.shield(inflight)
+            return self._count(Claim.DUPLICATE if processed else Claim.IN_PROGRESS)
+
+        # register before the first await so concurrent deliveries collapse onto us
+        self._inflight[event_id] = asyncio.get_running_loop().create_future()
+
+        try:
+            claim = await self._claim_shared(event_id, db)
+        except Exception:
+            self._settle(event_id, False)
+            raise
+
+        if claim is not Claim.NEW:
+            self._settle(event_id, claim is Claim.DUPLICATE)
+        return self._count(claim)
+
+    async def _claim_shared(self, event_id: str, db: AsyncSession) -> Claim:
+        redis = get_redis()
+        try:
+            if await redis.set(self._key(event_id), "processing", nx=True, ex=settings.webhook_claim_ttl):
+                claimed = True
+            else:
+                state = await redis.get(self._key(event_id))
+                if state == "done":
+                    return Claim.DUPLICATE
+                if state == "processing":
+                    return Claim.IN_PROGRESS
+                claimed = False
+        except Exception as e:
+            logger.warning(f"Webhook dedup store unavailable in Redis, using the database: {e}")
+            claimed = False
+
+        if await db.get(ProcessedWebhookEvent, event_id) is not None:
+            if claimed:
+                await self._mark_done(event_id)
+            return Claim.DUPLICATE
+
+        return Claim.NEW
+
+    async def complete(self, event_id: str, event_type: Optional[str], db: AsyncSession) -> None:
+        """Record the event as processed (durably, then in Redis)"""
+        try:
+            db.add(ProcessedWebhookEvent(event_id=event_id, event_type=event_type))
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+        finally:
+            await self._mark_done(event_id)
+            self._settle(event_id, True)
+
+    async def release(self, event_id: str) -> None:
+        """Give up a claim after a failure so a later retry processes the event"""
+        try:
+            await get_redis().delete(self._key(event_id))
+        except Exception as e:
+            logger.warning(f"Failed to release webhook claim {event_id}: {e}")
+        self._settle(event_id, False)
+
+    async def _mark_done(self, event_id: str) -> None:
+        try:
+            await get_redis().set(self._key(event_id), "done", ex=settings.webhook_dedup_ttl)
+        except Exception as e:
+            logger.warning(f"Failed to mark webhook {event_id} done in Redis: {e}")
+
+    def _settle(self, event_id: str, processed: bool) -> None:
+        future = self._inflight.pop(event_id, None)
+        if future is not None and not future.done():
+            future.set_result(processed)
+
+    def _count(self, claim: Claim) -> Claim:
+        if claim is Claim.DUPLICATE:
+            self.duplicates += 1
+        elif claim is Claim.IN_PROGRESS:
+            self.in_progress += 1
+        return claim
+
+    def stats(self) -> dict:
+        return {
+            "received": self.received,
+            "duplicates": self.duplicates,
+            "in_progress": self.in_progress,
+            "duplicate_rate": (self.duplicates + self.in_progress) / self.received if self.received else 0.0,
+        }
+
+
+webhook_events = WebhookEventStore()
@@ -0,0 +1,228 @@
+import asyncio
+import json
+import logging
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import or_, select, update
+
+from ..core.config import settings
+from ..db.database import AsyncSessionLocal
+from ..db.models import WebhookInbox
+from .webhook_events import webhook_events
+
+logger = logging.getLogger(__name__)
+
+# (event_type, resource, headers, body, db) -> None; raises HTTPException for bad signatures
+Processor = Callable[..., Awaitable[None]]
+
+
+def order_key_for(event: dict) -> str:
+    """The PayPal order an event belongs to; events for one order are applied in order"""
+    resource = event.get("resource") or {}
+    order_id = (resource.get("supplementary_data") or {}).get("related_ids", {}).get("order_id")
+    return str(order_id or resource.get("id") or event.get("id") or "")[:64]
+
+
+class WebhookPipeline:
+    """
+    Staged webhook processing.
+
+    The endpoint stores the raw delivery in ``webhook_inbox`` and returns;
+    a pool of async workers then verifies and applies it. Events are
+    sharded by order id onto per-worker queues, so one order's events are
+    handled in arrival order while different orders proceed in parallel.
+    A failed delivery is retried by its own worker before it takes the
+    next item, so a retry never overtakes later events for the order.
+    Deliveries that exhaust ``webhook_max_attempts`` stay in the inbox as
+    ``failed`` until an operator replays them (``replay``).
+    """
+
+    def __init__(self):
+        self._queues: List[asyncio.Queue] = []
+        self._workers: List[asyncio.Task] = []
+        self._processor: Optional[Processor] = None
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    @property
+    def depth(self) -> int:
+        return sum(queue.qsize() for queue in self._queues)
+
+    def is_saturated(self) -> bool:
+        return self.depth >= settings.webhook_queue_max
+
+    async def start(self, processor: Processor) -> None:
+        if self._workers:
+            return
+        self._processor = processor
+        self._queues = [asyncio.Queue() for _ in range(settings.webhook_workers)]
+        for i, queue in enumerate(self._queues):
+            self._workers.append(asyncio.create_task(self._worker(queue), name=f"webhook-worker-{i}"))
+        await self._recover()
+
+    async def stop(self) -> None:
+        # a worker sleeping on a retry leaves its row pending for the next start
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+        self._queues = []
+
+    def submit(self, inbox_id: int, order_key: str) -> None:
+        """Queue a stored delivery on the shard that owns its order"""
+        if not self._queues:
+            # not running (e.g. during shutdown); the row is picked up on the next start
+            return
+        shard = zlib.crc32(order_key.encode()) % len(self._queues)
+        self._queues[shard].put_nowait(inbox_id)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.depth,
+            "queue_max": settings.webhook_queue_max,
+            "workers": len(self._workers),
+            "processed": self.processed,
+            "rejected": self.rejected,
+            "failed": self.failed,
+        }
+
+    async def failed_deliveries(self, limit: int) -> List[dict]:
+        """Deliveries that were given up on, oldest first"""
+        async with AsyncSessionLocal() as db:
+            rows = await db.execute(
+                select(WebhookInbox.id, WebhookInbox.event_id, WebhookInbox.event_type, WebhookInbox.order_key,
+                       WebhookInbox.attempts, WebhookInbox.last_error, WebhookInbox.received_at)
+                .where(WebhookInbox.status == "failed")
+                .order_by(WebhookInbox.id)
+                .limit(limit)
+            )
+            return [dict(row._mapping) for row in rows]
+
+    async def replay(self, inbox_ids: Optional[List[int]] = None) -> int:
+        """Put failed deliveries (all, or just ``inbox_ids``) back to pending with fresh attempts"""
+        query = (
+            update(WebhookInbox)
+            .where(WebhookInbox.status == "failed")
+            .values(status="pending", attempts=0, claimed_at=None, processed_at=None)
+            .returning(WebhookInbox.id, WebhookInbox.order_key)
+        )
+        if inbox_ids:
+            query = query.where(WebhookInbox.id.in_(inbox_ids))
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(query)).all()
+            await db.commit()
+
+        for inbox_id, order_key in sorted(rows):
+            self.submit(inbox_id, order_key)
+        if rows:
+            logger.info(f"Replaying {len(rows)} failed webhook deliveries")
+        return len(rows)
+
+    async def _recover(self) -> None:
+        """Re-queue deliveries left pending (or stuck processing) by a previous run"""
+        stale = datetime.now(timezone.utc) - timedelta(seconds=settings.webhook_stale_claim)
+        async with AsyncSessionLocal() as db:
+            rows = await db.execute(
+                select(WebhookInbox.id, WebhookInbox.order_key)
+                .where(or_(
+                    WebhookInbox.status == "pending",
+                    (WebhookInbox.status == "processing") & (WebhookInbox.claimed_at < stale),
+                ))
+                .order_by(WebhookInbox.id)
+            )
+            recovered = 0
+            for inbox_id, order_key in rows:
+                self.submit(inbox_id, order_key)
+                recovered += 1
+        if recovered:
+            logger.info(f"Re-queued {recovered} unprocessed webhook deliveries")
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        while True:
+            inbox_id = await queue.get()
+            try:
+                while (delay := await self._process(inbox_id)) is not None:
+                    await asyncio.sleep(delay)
+            except Exception:
+                logger.error(f"Webhook pipeline failed on inbox row {inbox_id}", exc_info=True)
+            finally:
+                queue.task_done()
+
+    async def _process(self, inbox_id: int) -> Optional[float]:
+        """Apply one delivery; returns a backoff delay when it should be retried"""
+        now = datetime.now(timezone.utc)
+        stale = now - timedelta(seconds=settings.webhook_stale_claim)
+
+        async with AsyncSessionLocal() as db:
+            # conditional claim so two processes recovering the same row don't both run it
+            claimed = await db.execute(
+                update(WebhookInbox)
+                .where(
+                    WebhookInbox.id == inbox_id,
+                    or_(
+                        WebhookInbox.status == "pending",
+                        (WebhookInbox.status == "processing") & (WebhookInbox.claimed_at < stale),
+                    ),
+                )
+                .values(status="processing", claimed_at=now, attempts=WebhookInbox.attempts + 1)
+                .returning(WebhookInbox.event_id, WebhookInbox.event_type, WebhookInbox.order_key,
+                           WebhookInbox.headers, WebhookInbox.body, WebhookInbox.attempts)
+            )
+            row = claimed.first()
+            await db.commit()
+            if row is None:
+                return None
+
+            event_id, event_type, order_key, headers, body, attempts = row
+            event = json.loads(body)
+
+            try:
+                await self._processor(event_type, event.get("resource", {}), json.loads(headers), body, db)
+            except HTTPException as e:
+                await db.rollback()
+                await self._finish(db, inbox_id, "rejected", str(e.detail))
+                self.rejected += 1
+                if event_id:
+                    await webhook_events.release(event_id)
+                return None
+            except Exception as e:
+                await db.rollback()
+                if attempts >= settings.webhook_max_attempts:
+                    logger.critical(
+                        f"Dead-lettered webhook {event_id} ({event_type}) for order {order_key} after "
+                        f"{attempts} attempts; replay it with POST /admin/webhooks/replay",
+                        exc_info=True,
+                    )
+                    await self._finish(db, inbox_id, "failed", str(e))
+                    self.failed += 1
+                    if event_id:
+                        await webhook_events.release(event_id)
+                else:
+                    await self._finish(db, inbox_id, "pending", str(e), processed=False)
+                    return settings.webhook_retry_backoff * (2 ** (attempts - 1))
+                return None
+
+            await self._finish(db, inbox_id, "done")
+            if event_id:
+                await webhook_events.complete(event_id, event_type, db)
+            self.processed += 1
+            return None
+
+    async def _finish(self, db, inbox_id: int, status: str, error: Optional[str] = None, processed: bool = True) -> None:
+        await db.execute(
+            update(WebhookInbox)
+            .where(WebhookInbox.id == inbox_id)
+            .values(
+                status=status,
+                last_error=error,
+                processed_at=datetime.now(timezone.utc) if processed else None,
+            )
+        )
+        await db.commit()
+
+
+webhook_pipeline = WebhookPipeline()
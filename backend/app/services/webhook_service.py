@@ -1,21 +1,64 @@
-import requests
-from typing import Dict
+import asyncio
+import base64
+import enum
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, Union
+from urllib.parse import urlparse
 import logging
 import json
 
+from cryptography import x509
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding
+
+from ..core.config import settings
+from ..core.cache import TTLCache
+
 logger = logging.getLogger(__name__)
 
-class WebhookService: 
+
+class CertificateUnavailable(Exception):
+    """Raised when a signing certificate can't be fetched or trusted"""
+
+
+class VerificationUnavailable(Exception):
+    """Raised when a signature couldn't be checked at all (PayPal down, cert unreachable)"""
+
+
+class Verification(enum.Enum):
+    VALID = "valid"
+    INVALID = "invalid"
+    # no verdict: the delivery should be retried, not rejected
+    UNAVAILABLE = "unavailable"
+
+
+class WebhookService:
     """Service to verify PayPal webhook signatures"""
-    
+
+    def __init__(self):
+        self.cert_cache = TTLCache(
+            max_size=settings.paypal_cert_cache_size,
+            ttl=settings.paypal_cert_cache_ttl,
+        )
+        self._cert_fetches: Dict[str, asyncio.Task] = {}
+
     async def verify_webhook_signature(
         self,
         webhook_id: str,
         headers:  Dict[str, str],
-        body: str  # Changed from bytes to string
-    ) -> bool:
+        body: Union[str, bytes]
+    ) -> Verification:
         """
         Verify that the webhook request actually came from PayPal
+
+        In ``local`` mode the transmission signature is checked in-process
+        against PayPal's (cached) signing certificate. The remote
+        verify-webhook-signature API is used in ``remote`` mode, or when
+        the local check can't reach a verdict (e.g. the cert is unavailable).
+        ``UNAVAILABLE`` means neither could decide, so the delivery
+        should be retried rather than rejected.
         """
         try:
             # Extract signature headers
@@ -24,77 +67,169 @@ class WebhookService:
             cert_url = headers.get("paypal-cert-url")
             auth_algo = headers.get("paypal-auth-algo")
             transmission_sig = headers.get("paypal-transmission-sig")
-            
-            # Debug logging
-            logger.info(f"Webhook ID: {webhook_id}")
-            logger.info(f"Transmission ID: {transmission_id}")
-            logger.info(f"Transmission Time: {transmission_time}")
-            logger.info(f"Cert URL: {cert_url}")
-            logger.info(f"Auth Algo: {auth_algo}")
-            logger.info(f"Transmission Sig: {transmission_sig}")
-            
-            if not webhook_id: 
+
+            logger.debug(f"Webhook ID: {webhook_id}, Transmission ID: {transmission_id}")
+
+            if not webhook_id:
                 logger.error("PAYPAL_WEBHOOK_ID is not set in environment variables!")
-                return False
-            
+                return Verification.INVALID
+
             if not all([transmission_id, transmission_time, cert_url, auth_algo, transmission_sig]):
                 logger.error("Missing required webhook headers")
                 logger.error(f"Headers received: {headers}")
-                return False
-            
-            # Get PayPal settings
-            from ..core.config import settings
-            
-            # Use PayPal's verification API
-            verification_url = f"{settings.paypal_api_base}/v1/notifications/verify-webhook-signature"
-            
-            # Get access token
-            from .paypal_service import paypal_service
-            access_token = await paypal_service.get_access_token()
-            
-            # Parse body as JSON to re-serialize it
-            # This ensures the format matches what PayPal expects
-            try:
-                webhook_event = json.loads(body) if isinstance(body, str) else json.loads(body.decode('utf-8'))
-            except: 
-                webhook_event = body
-            
-            verification_data = {
-                "transmission_id": transmission_id,
-                "transmission_time": transmission_time,
-                "cert_url": cert_url,
-                "auth_algo": auth_algo,
-                "transmission_sig": transmission_sig,
-                "webhook_id": webhook_id,
-                "webhook_event": webhook_event
-            }
-            
-            logger.info(f"Sending verification request to: {verification_url}")
-            
-            response = requests.post(
-                verification_url,
-                json=verification_data,
-                headers={
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {access_token}"
-                }
+                return Verification.INVALID
+
+            raw_body = body.encode("utf-8") if isinstance(body, str) else body
+
+            if settings.paypal_webhook_verify_mode == "local":
+                try:
+                    valid = await self._verify_locally(
+                        webhook_id=webhook_id,
+                        transmission_id=transmission_id,
+                        transmission_time=transmission_time,
+                        cert_url=cert_url,
+                        auth_algo=auth_algo,
+                        transmission_sig=transmission_sig,
+                        body=raw_body,
+                    )
+                    return Verification.VALID if valid else Verification.INVALID
+                except CertificateUnavailable as e:
+                    logger.warning(f"Local webhook verification unavailable ({e}), using PayPal API")
+
+            return await self._verify_remotely(
+                webhook_id=webhook_id,
+                transmission_id=transmission_id,
+                transmission_time=transmission_time,
+                cert_url=cert_url,
+                auth_algo=auth_algo,
+                transmission_sig=transmission_sig,
+                body=raw_body,
             )
-            
-            logger.info(f"Verification response status: {response.status_code}")
-            logger.info(f"Verification response:  {response.text}")
-            
-            result = response.json()
-            verification_status = result.get("verification_status")
-            
-            if verification_status == "SUCCESS":
-                logger.info("Webhook signature verified successfully")
-                return True
-            else: 
-                logger.warning(f"Webhook verification failed: {verification_status}")
-                return False
-                
+
         except Exception as e:
             logger.error(f"Error verifying webhook signature: {str(e)}", exc_info=True)
+            return Verification.UNAVAILABLE
+
+    async def _verify_locally(
+        self,
+        webhook_id: str,
+        transmission_id: str,
+        transmission_time: str,
+        cert_url: str,
+        auth_algo: str,
+        transmission_sig: str,
+        body: bytes,
+    ) -> bool:
+        """Check the CRC32 / SHA256withRSA transmission signature in-process"""
+        if auth_algo != "SHA256withRSA":
+            raise CertificateUnavailable(f"unsupported auth algo {auth_algo}")
+
+        cert = await self.get_certificate(cert_url)
+
+        message = f"{transmission_id}|{transmission_time}|{webhook_id}|{zlib.crc32(body)}"
+        try:
+            signature = base64.b64decode(transmission_sig)
+            cert.public_key().verify(
+                signature,
+                message.encode("utf-8"),
+                padding.PKCS1v15(),
+                hashes.SHA256(),
+            )
+        except (InvalidSignature, ValueError):
+            logger.warning("Webhook signature verification failed (local)")
             return False
 
-webhook_service = WebhookService()
\ No newline at end of file
+        return True
+
+    async def _verify_remotely(
+        self,
+        webhook_id: str,
+        transmission_id: str,
+        transmission_time: str,
+        cert_url: str,
+        auth_algo: str,
+        transmission_sig: str,
+        body: bytes,
+    ) -> Verification:
+        """Ask PayPal's verify-webhook-signature API"""
+        from .paypal_service import paypal_service
+
+        # Parse body as JSON to re-serialize it
+        # This ensures the format matches what PayPal expects
+        try:
+            webhook_event = json.loads(body)
+        except ValueError:
+            webhook_event = body.decode("utf-8", errors="replace")
+
+        verification_data = {
+            "transmission_id": transmission_id,
+            "transmission_time": transmission_time,
+            "cert_url": cert_url,
+            "auth_algo": auth_algo,
+            "transmission_sig": transmission_sig,
+            "webhook_id": webhook_id,
+            "webhook_event": webhook_event
+        }
+
+        response = await paypal_service.verify_webhook_signature(verification_data)
+
+        logger.info(f"Verification response status: {response.status_code}")
+
+        if response.status_code >= 500 or response.status_code == 429:
+            logger.warning(f"PayPal could not verify the webhook signature ({response.status_code})")
+            return Verification.UNAVAILABLE
+
+        verification_status = response.json().get("verification_status")
+
+        if verification_status == "SUCCESS":
+            logger.info("Webhook signature verified successfully")
+            return Verification.VALID
+
+        logger.warning(f"Webhook verification failed: {verification_status}")
+        return Verification.INVALID
+
+    async def get_certificate(self, cert_url: str) -> x509.Certificate:
+        """Return the signing cert at ``cert_url``, downloading it at most once per TTL"""
+        cert = self.cert_cache.get(cert_url)
+        if cert is not None:
+            return cert
+
+        self._check_cert_url(cert_url)
+
+        task = self._cert_fetches.get(cert_url)
+        if task is None or task.done():
+            task = asyncio.ensure_future(self._fetch_certificate(cert_url))
+            self._cert_fetches[cert_url] = task
+            task.add_done_callback(lambda _: self._cert_fetches.pop(cert_url, None))
+
+        return await asyncio.shield(task)
+
+    def _check_cert_url(self, cert_url: str) -> None:
+        parsed = urlparse(cert_url)
+        if parsed.scheme != "https" or parsed.hostname not in settings.paypal_cert_allowed_hosts:
+            raise CertificateUnavailable(f"cert url host not allowed: {parsed.hostname}")
+
+    async def _fetch_certificate(self, cert_url: str) -> x509.Certificate:
+        from .paypal_service import paypal_service
+
+        try:
+            response = await paypal_service.fetch_cert(cert_url)
+        except Exception as e:
+            raise CertificateUnavailable(f"failed to download cert: {e}") from e
+
+        if response.status_code != 200:
+            raise CertificateUnavailable(f"cert download returned {response.status_code}")
+
+        try:
+            cert = x509.load_pem_x509_certificate(response.content)
+        except ValueError as e:
+            raise CertificateUnavailable("cert is not valid PEM") from e
+
+        now = datetime.now(timezone.utc)
+        if not (cert.not_valid_before_utc <= now <= cert.not_valid_after_utc):
+            raise CertificateUnavailable("cert is outside its validity period")
+
+        self.cert_cache.put(cert_url, cert)
+        return cert
+
+webhook_service = WebhookService()
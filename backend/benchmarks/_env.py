@@ -0,0 +1,39 @@
+"""Placeholder settings so benchmarks can import the app without a .env"""
+import os
+
+DEFAULTS = {
+    "DATABASE_URL": "sqlite:///./bench.db",
+    "SECRET_KEY": "benchmark-secret",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_TIME": "30",
+    "PAYPAL_MODE": "sandbox",
+    "PAYPAL_CLIENT_ID": "bench",
+    "PAYPAL_CLIENT_SECRET": "bench",
+    "PAYPAL_API_BASE": "http://127.0.0.1:9",
+    "PAYPAL_WEBHOOK_ID": "bench",
+    "REDIS_HOST": "127.0.0.1",
+    "REDIS_PORT": "6379",
+    "REDIS_USER": "",
+    "REDIS_PASS": "",
+    "OTP_EXP": "300",
+    "SMTP_HOST": "127.0.0.1",
+    "SMTP_PORT": "2525",
+    "SMTP_USER": "",
+    "SMTP_PASS": "",
+    "FROM_EMAIL": "bench@givehub.local",
+    "FRONTEND_URL": "http://localhost:5173",
+    "RATE_LIMIT_BACKEND": "memory",
+}
+
+
+def apply_defaults() -> None:
+    for key, value in DEFAULTS.items():
+        os.environ.setdefault(key, value)
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
@@ -0,0 +1,96 @@
+"""
+Login hashing under concurrent load.
+
+Fires ``--concurrency`` simultaneous argon2 verifications (what a burst
+of /login requests does) while a probe coroutine measures how long the
+event loop takes to answer, i.e. what every other request would feel.
+
+    python -m benchmarks.bench_login --logins 64 --concurrency 32
+"""
+import argparse
+import asyncio
+import time
+
+from ._env import apply_defaults, percentile
+
+apply_defaults()
+
+from starlette.concurrency import run_in_threadpool  # noqa: E402
+
+from app.core.hashing import hashing_executor  # noqa: E402
+from app.core.security import (  # noqa: E402
+    hash_password,
+    verify_and_update_password,
+    verify_and_update_password_async,
+)
+
+
+async def probe_loop(stop: asyncio.Event, lags: list) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.005)
+        lags.append(time.perf_counter() - start - 0.005)
+
+
+async def run_mode(mode: str, stored_hash: str, logins: int, concurrency: int) -> dict:
+    async def inline():
+        return verify_and_update_password("correct horse", stored_hash)
+
+    async def threadpool():
+        return await run_in_threadpool(verify_and_update_password, "correct horse", stored_hash)
+
+    async def executor():
+        return await verify_and_update_password_async("correct horse", stored_hash)
+
+    login = {"inline": inline, "threadpool": threadpool, "executor": executor}[mode]
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await login()
+            latencies.append(time.perf_counter() - start)
+
+    stop = asyncio.Event()
+    lags: list = []
+    probe = asyncio.create_task(probe_loop(stop, lags))
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+
+    return {
+        "mode": mode,
+        "logins_per_s": logins / elapsed,
+        "login_p50_ms": percentile(latencies, 50) * 1000,
+        "login_p99_ms": percentile(latencies, 99) * 1000,
+        "loop_lag_p99_ms": percentile(lags, 99) * 1000,
+        "loop_lag_max_ms": max(lags, default=0) * 1000,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--modes", default="inline,threadpool,executor")
+    args = parser.parse_args()
+
+    stored_hash = hash_password("correct horse")
+    hashing_executor.start()
+    try:
+        for mode in args.modes.split(","):
+            result = await run_mode(mode, stored_hash, args.logins, args.concurrency)
+            print(
+                f"{result['mode']:>10}: {result['logins_per_s']:7.1f} logins/s  "
+                f"login p50 {result['login_p50_ms']:7.1f}ms  p99 {result['login_p99_ms']:7.1f}ms  "
+                f"loop lag p99 {result['loop_lag_p99_ms']:7.1f}ms  max {result['loop_lag_max_ms']:7.1f}ms"
+            )
+    finally:
+        hashing_executor.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
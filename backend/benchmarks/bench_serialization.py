@@ -0,0 +1,99 @@
+"""
+Per-request serialization cost of a page of donations.
+
+Renders ``--rows`` Donation ORM objects the way each response path does:
+
+    stdlib   FastAPI's default: validate, dump to dicts, json.dumps
+    orjson   the same, rendered by ORJSONResponse
+    adapter  pre-built TypeAdapter: validate and dump to JSON bytes in one pass
+
+    python -m benchmarks.bench_serialization --rows 100 --iterations 2000
+"""
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from ._env import apply_defaults, percentile
+
+apply_defaults()
+
+from fastapi.responses import JSONResponse, ORJSONResponse  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+from app.core.serialization import adapter_response  # noqa: E402
+from app.db.models import Donation  # noqa: E402
+from app.schemas.donation import DonationResponse, donation_list_adapter  # noqa: E402
+
+
+def make_rows(count: int) -> list:
+    now = datetime.now(timezone.utc)
+    return [
+        Donation(
+            id=i,
+            user_id=1,
+            amount=10 + i,
+            status=i % 3 != 0,
+            payment_reference=f"5O190127TN364715{i:04d}",
+            created_at=now - timedelta(minutes=i),
+        )
+        for i in range(count)
+    ]
+
+
+def fastapi_path(response_class):
+    # what FastAPI does with response_model=List[DonationResponse]
+    field = TypeAdapter(List[DonationResponse])
+
+    def render(rows):
+        value = field.validate_python(rows, from_attributes=True)
+        return response_class(field.dump_python(value, mode="json"))
+
+    return render
+
+
+def adapter_path(rows):
+    return adapter_response(donation_list_adapter, rows)
+
+
+def run(name: str, render, rows: list, iterations: int) -> dict:
+    for _ in range(min(iterations, 100)):
+        render(rows)
+
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        response = render(rows)
+        timings.append(time.perf_counter() - start)
+
+    return {
+        "path": name,
+        "bytes": len(response.body),
+        "p50_us": percentile(timings, 50) * 1e6,
+        "p99_us": percentile(timings, 99) * 1e6,
+        "per_s": iterations / sum(timings),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    paths = {
+        "stdlib": fastapi_path(JSONResponse),
+        "orjson": fastapi_path(ORJSONResponse),
+        "adapter": adapter_path,
+    }
+    for name, render in paths.items():
+        result = run(name, render, rows, args.iterations)
+        print(
+            f"{result['path']:>8}: p50 {result['p50_us']:8.1f}us  p99 {result['p99_us']:8.1f}us  "
+            f"{result['per_s']:9.0f} pages/s  ({result['bytes']} bytes)"
+        )
+
+
+if __name__ == "__main__":
+    main()
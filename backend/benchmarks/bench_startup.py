@@ -0,0 +1,140 @@
+"""
+Worker startup time, from a cold interpreter to ready to serve.
+
+Each sample is a fresh Python process that records:
+
+    import    ``import app.main``
+    create    ``create_app()`` (routers, services and drivers are imported here)
+    ready     the lifespan startup: pools opened and warmed, workers started
+    first     the first database query once ready
+    drain     the lifespan shutdown: queues drained, pools closed
+
+``--workers`` processes are started at once per round, as ``uvicorn
+--workers`` would. Redis is fakeredis over TCP and the database is a
+migrated SQLite file unless ``--database-url`` / ``--redis-url`` are given.
+Run it with ``STARTUP_WARM=false`` to compare against unwarmed pools.
+
+    python -m benchmarks.bench_startup --rounds 5 --workers 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from ._env import DEFAULTS, percentile
+from .stubs import free_ports
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+PHASES = ("import", "create", "ready", "first", "drain")
+
+WORKER = """
+import asyncio, json, time
+start = time.perf_counter()
+marks = {}
+
+import app.main
+marks["import"] = time.perf_counter()
+application = app.main.create_app()
+marks["create"] = time.perf_counter()
+
+async def run():
+    from sqlalchemy import text
+    from app.db.database import AsyncSessionLocal
+    async with application.router.lifespan_context(application):
+        marks["ready"] = time.perf_counter()
+        async with AsyncSessionLocal() as db:
+            await db.execute(text("SELECT 1"))
+        marks["first"] = time.perf_counter()
+    marks["drain"] = time.perf_counter()
+
+asyncio.run(run())
+previous, phases = start, {}
+for name in %r:
+    phases[name] = marks[name] - previous
+    previous = marks[name]
+phases["total_to_ready"] = marks["ready"] - start
+print("RESULT " + json.dumps(phases))
+""" % (PHASES,)
+
+
+def worker_environment(database_url: str, redis_host: str, redis_port) -> dict:
+    env = {**DEFAULTS, **os.environ}
+    env.update({
+        "DATABASE_URL": database_url,
+        "REDIS_HOST": redis_host,
+        "REDIS_PORT": str(redis_port),
+        "RATE_LIMIT_BACKEND": "memory",
+    })
+    return env
+
+
+def run_round(workers: int, env: dict) -> list:
+    processes = [
+        subprocess.Popen([sys.executable, "-c", WORKER], cwd=BACKEND_DIR, env=env,
+                         stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        for _ in range(workers)
+    ]
+    samples = []
+    for process in processes:
+        output, _ = process.communicate(timeout=120)
+        for line in output.splitlines():
+            if line.startswith("RESULT "):
+                samples.append(json.loads(line[len("RESULT "):]))
+                break
+        else:
+            raise RuntimeError(f"worker exited with {process.returncode} without a result")
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=1, help="processes started together per round")
+    parser.add_argument("--database-url", default=None, help="defaults to a migrated SQLite file")
+    parser.add_argument("--redis-url", default=None, help="host:port; defaults to an in-process fakeredis server")
+    args = parser.parse_args()
+
+    fake_redis = None
+    if args.redis_url:
+        redis_host, redis_port = args.redis_url.rsplit(":", 1)
+    else:
+        from .loadtest import start_fake_redis
+        redis_host, redis_port = "127.0.0.1", free_ports(1)[0]
+        fake_redis = start_fake_redis(redis_port)
+
+    database_url, db_path = args.database_url, None
+    if database_url is None:
+        db_path = BACKEND_DIR / "bench_startup.db"
+        if db_path.exists():
+            db_path.unlink()
+        database_url = f"sqlite:///{db_path}"
+
+    env = worker_environment(database_url, redis_host, redis_port)
+    subprocess.run([sys.executable, "-m", "alembic", "upgrade", "head"], cwd=BACKEND_DIR, env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    samples = []
+    try:
+        for number in range(args.rounds):
+            started = time.perf_counter()
+            samples.extend(run_round(args.workers, env))
+            print(f"round {number + 1}: {args.workers} worker(s) up and down in {time.perf_counter() - started:.2f}s")
+    finally:
+        if fake_redis is not None:
+            fake_redis.shutdown()
+            fake_redis.server_close()
+        if db_path is not None:
+            db_path.unlink(missing_ok=True)
+
+    print(f"\n{len(samples)} workers, STARTUP_WARM={env.get('STARTUP_WARM', 'true')}")
+    for phase in (*PHASES, "total_to_ready"):
+        timings = [sample[phase] for sample in samples]
+        print(f"  {phase:>15}: p50 {percentile(timings, 50) * 1000:8.1f}ms  max {max(timings) * 1000:8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
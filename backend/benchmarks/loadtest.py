@@ -0,0 +1,327 @@
+"""
+End-to-end load test against local stand-ins.
+
+Boots the API (uvicorn subprocess) against a fake PayPal server, an SMTP
+sink, fakeredis (or ``--redis-url``) and SQLite (or ``--database-url``),
+then drives scripted scenarios at the requested concurrency:
+
+    signup    register -> read the OTP from the SMTP sink -> verify -> login
+    donate    create-order -> capture-order -> my-donations, per user
+    webhooks  a storm of PAYMENT.CAPTURE.COMPLETED deliveries, each sent
+              ``--duplicates`` times concurrently (as PayPal retries do)
+
+Latency percentiles and RPS are reported per endpoint and written as
+JSON; ``--compare`` prints the p99 change against an earlier run.
+
+    python -m benchmarks.loadtest --users 50 --concurrency 25 --paypal-latency 0.08
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+from ._env import percentile
+from .stubs import SMTPSink, fake_paypal_app, free_ports, serve_asgi
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+class Recorder:
+    """Latency and status samples per endpoint, grouped by scenario"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[tuple]] = defaultdict(list)
+
+    async def call(self, client: httpx.AsyncClient, endpoint: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            self.samples[endpoint].append((time.perf_counter() - start, type(e).__name__))
+            return None
+        self.samples[endpoint].append((time.perf_counter() - start, response.status_code))
+        return response
+
+    def summary(self, duration: float) -> dict:
+        endpoints = {}
+        for endpoint, samples in self.samples.items():
+            latencies = [latency for latency, _ in samples]
+            errors = sum(1 for _, code in samples if not isinstance(code, int) or code >= 400)
+            endpoints[endpoint] = {
+                "requests": len(samples),
+                "errors": errors,
+                "rps": len(samples) / duration if duration else 0.0,
+                "p50_ms": percentile(latencies, 50) * 1000,
+                "p95_ms": percentile(latencies, 95) * 1000,
+                "p99_ms": percentile(latencies, 99) * 1000,
+                "max_ms": max(latencies, default=0) * 1000,
+            }
+        return {"duration_s": duration, "endpoints": endpoints}
+
+
+async def bounded(concurrency: int, jobs) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(job):
+        async with semaphore:
+            await job
+
+    await asyncio.gather(*(run(job) for job in jobs))
+
+
+async def signup(client, sink: SMTPSink, recorder: Recorder, run_id: str, index: int) -> Optional[str]:
+    email_address = f"loadtest-{run_id}-{index}@example.com"
+    response = await recorder.call(client, "POST /register", "POST", "/register", json={
+        "name": f"Load Test {index}", "email": email_address, "password": "load-test-password",
+    })
+    if response is None or response.status_code != 201:
+        return None
+
+    try:
+        otp = await sink.wait_for_otp(email_address)
+    except (asyncio.TimeoutError, ValueError):
+        return None
+
+    await recorder.call(client, "POST /verify-email", "POST", "/verify-email", json={"email": email_address, "otp": otp})
+    response = await recorder.call(client, "POST /login", "POST", "/login", data={
+        "username": email_address, "password": "load-test-password",
+    })
+    if response is None or response.status_code != 200:
+        return None
+    return response.json()["access_token"]
+
+
+async def donate(client, recorder: Recorder, token: str, iterations: int) -> None:
+    headers = {"Authorization": f"Bearer {token}"}
+    for i in range(iterations):
+        response = await recorder.call(client, "POST /donations/create-order", "POST", "/donations/create-order",
+                                       json={"amount": 5 + i}, headers=headers)
+        if response is None or response.status_code != 200:
+            continue
+        await recorder.call(client, "POST /donations/capture-order", "POST", "/donations/capture-order",
+                            json={"order_id": response.json()["order_id"]}, headers=headers)
+        await recorder.call(client, "GET /donations/my-donations", "GET", "/donations/my-donations", headers=headers)
+
+
+async def webhook_storm(client, recorder: Recorder, tokens: List[str], events: int, duplicates: int, concurrency: int) -> None:
+    # pending orders for the events to settle (setup, not measured)
+    setup = Recorder()
+    orders = []
+
+    async def create(token):
+        response = await setup.call(client, "setup", "POST", "/donations/create-order",
+                                    json={"amount": 10}, headers={"Authorization": f"Bearer {token}"})
+        if response is not None and response.status_code == 200:
+            orders.append(response.json()["order_id"])
+
+    await bounded(concurrency, (create(tokens[i % len(tokens)]) for i in range(events)))
+
+    headers = {
+        "paypal-transmission-id": str(uuid.uuid4()),
+        "paypal-transmission-time": datetime.now(timezone.utc).isoformat(),
+        "paypal-cert-url": "https://api.sandbox.paypal.com/v1/notifications/certs/CERT-loadtest",
+        "paypal-auth-algo": "SHA256withRSA",
+        "paypal-transmission-sig": "bG9hZHRlc3Q=",
+    }
+    deliveries = []
+    for order_id in orders:
+        event = {
+            "id": f"WH-{uuid.uuid4()}",
+            "event_type": "PAYMENT.CAPTURE.COMPLETED",
+            "resource": {"id": f"CAP-{order_id}", "supplementary_data": {"related_ids": {"order_id": order_id}}},
+        }
+        body = json.dumps(event)
+        deliveries += [
+            recorder.call(client, "POST /webhooks/paypal", "POST", "/webhooks/paypal",
+                          content=body, headers={**headers, "Content-Type": "application/json"})
+            for _ in range(duplicates)
+        ]
+    await bounded(concurrency, deliveries)
+
+
+def start_fake_redis(port: int):
+    from fakeredis import TcpFakeServer
+
+    server = TcpFakeServer(("127.0.0.1", port), server_type="redis")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def app_environment(args, paypal_port: int, smtp_port: int, redis_host: str, redis_port: int) -> dict:
+    env = {
+        **os.environ,
+        "DATABASE_URL": args.database_url,
+        "SECRET_KEY": "loadtest-secret",
+        "ALGORITHM": "HS256",
+        "ACCESS_TOKEN_EXPIRE_TIME": "60",
+        "PAYPAL_MODE": "sandbox",
+        "PAYPAL_CLIENT_ID": "loadtest",
+        "PAYPAL_CLIENT_SECRET": "loadtest",
+        "PAYPAL_API_BASE": f"http://127.0.0.1:{paypal_port}",
+        "PAYPAL_WEBHOOK_ID": "loadtest",
+        "PAYPAL_WEBHOOK_VERIFY_MODE": "remote",
+        "REDIS_HOST": redis_host,
+        "REDIS_PORT": str(redis_port),
+        "REDIS_USER": "",
+        "REDIS_PASS": "",
+        "OTP_EXP": "300",
+        "SMTP_HOST": "127.0.0.1",
+        "SMTP_PORT": str(smtp_port),
+        "SMTP_USER": "",
+        "SMTP_PASS": "",
+        "SMTP_STARTTLS": "false",
+        "FROM_EMAIL": "loadtest@givehub.local",
+        "FRONTEND_URL": "http://localhost:5173",
+        "RATE_LIMIT_ENABLED": "false",
+    }
+    return env
+
+
+async def wait_until_ready(base_url: str, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"API exited with code {process.returncode}")
+            try:
+                if (await client.get("/")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError("API did not become ready")
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(results: dict, baseline: Optional[dict]) -> None:
+    for scenario, result in results["scenarios"].items():
+        print(f"\n{scenario} ({result['duration_s']:.1f}s)")
+        for endpoint, stats in result["endpoints"].items():
+            line = (
+                f"  {endpoint:<32} {stats['requests']:6d} req  {stats['errors']:4d} err  {stats['rps']:8.1f} rps  "
+                f"p50 {stats['p50_ms']:7.1f}ms  p95 {stats['p95_ms']:7.1f}ms  p99 {stats['p99_ms']:7.1f}ms"
+            )
+            previous = (baseline or {}).get("scenarios", {}).get(scenario, {}).get("endpoints", {}).get(endpoint)
+            if previous and previous["p99_ms"]:
+                change = (stats["p99_ms"] - previous["p99_ms"]) / previous["p99_ms"] * 100
+                line += f"  (p99 {change:+.0f}% vs baseline)"
+            print(line)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default="signup,donate,webhooks")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=3, help="donations per user")
+    parser.add_argument("--events", type=int, default=100, help="distinct webhook events in the storm")
+    parser.add_argument("--duplicates", type=int, default=3, help="deliveries per webhook event")
+    parser.add_argument("--paypal-latency", type=float, default=0.05, help="seconds per fake PayPal call")
+    parser.add_argument("--database-url", default="sqlite:///./loadtest.db")
+    parser.add_argument("--redis-url", help="host:port of a real Redis (default: in-process fakeredis)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the API")
+    parser.add_argument("--output", help="results JSON (default: benchmarks/results/loadtest-<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier results JSON to compare p99 against")
+    args = parser.parse_args()
+    scenarios = args.scenarios.split(",")
+
+    if args.database_url.startswith("sqlite:///./"):
+        (BACKEND_DIR / args.database_url.removeprefix("sqlite:///./")).unlink(missing_ok=True)
+
+    paypal_port, smtp_port, api_port, fake_redis_port = free_ports(4)
+    paypal = await serve_asgi(fake_paypal_app(args.paypal_latency), paypal_port)
+    sink = SMTPSink()
+    await sink.start(smtp_port)
+
+    redis_server = None
+    if args.redis_url:
+        redis_host, redis_port = args.redis_url.rsplit(":", 1)
+    else:
+        redis_server = start_fake_redis(fake_redis_port)
+        redis_host, redis_port = "127.0.0.1", fake_redis_port
+
+    env = app_environment(args, paypal_port, smtp_port, redis_host, int(redis_port))
+    subprocess.run([sys.executable, "-m", "alembic", "upgrade", "head"], cwd=BACKEND_DIR, env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+    api = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:create_app", "--factory", "--host", "127.0.0.1", "--port", str(api_port),
+         "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR, env=env,
+    )
+
+    base_url = f"http://127.0.0.1:{api_port}"
+    results = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "config": vars(args),
+        "scenarios": {},
+    }
+    try:
+        await wait_until_ready(base_url, api)
+        limits = httpx.Limits(max_connections=args.concurrency * args.duplicates)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+            run_id = uuid.uuid4().hex[:8]
+
+            recorder, started = Recorder(), time.perf_counter()
+            tokens_or_none = []
+
+            async def one_signup(index):
+                tokens_or_none.append(await signup(client, sink, recorder, run_id, index))
+
+            await bounded(args.concurrency, (one_signup(i) for i in range(args.users)))
+            tokens = [token for token in tokens_or_none if token]
+            if "signup" in scenarios:
+                results["scenarios"]["signup"] = recorder.summary(time.perf_counter() - started)
+            if not tokens:
+                raise RuntimeError("no user could sign up; is the API healthy?")
+
+            if "donate" in scenarios:
+                recorder, started = Recorder(), time.perf_counter()
+                await bounded(args.concurrency, (donate(client, recorder, token, args.iterations) for token in tokens))
+                results["scenarios"]["donate"] = recorder.summary(time.perf_counter() - started)
+
+            if "webhooks" in scenarios:
+                recorder, started = Recorder(), time.perf_counter()
+                await webhook_storm(client, recorder, tokens, args.events, args.duplicates, args.concurrency)
+                results["scenarios"]["webhooks"] = recorder.summary(time.perf_counter() - started)
+    finally:
+        api.terminate()
+        await asyncio.to_thread(api.wait, 30)
+        paypal.should_exit = True
+        await paypal.task
+        await sink.stop()
+        if redis_server is not None:
+            redis_server.shutdown()
+
+    results["emails_received"] = sink.received
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+    print_report(results, baseline)
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"loadtest-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,179 @@
+"""
+Local stand-ins for the services the API talks to, for load testing.
+
+- ``fake_paypal_app``: an ASGI app answering the PayPal endpoints the
+  backend calls, each after a configurable delay.
+- ``SMTPSink``: a minimal SMTP server that accepts and keeps every message.
+- ``serve_asgi``: run an ASGI app with uvicorn inside the current loop.
+"""
+import asyncio
+import email
+import itertools
+import re
+import socket
+from collections import defaultdict
+from email.message import Message
+from typing import Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+
+
+def free_ports(count: int) -> List[int]:
+    """``count`` distinct unused local ports (all held open while picking)"""
+    sockets = [socket.socket() for _ in range(count)]
+    try:
+        for sock in sockets:
+            sock.bind(("127.0.0.1", 0))
+        return [sock.getsockname()[1] for sock in sockets]
+    finally:
+        for sock in sockets:
+            sock.close()
+
+
+def fake_paypal_app(latency: float = 0.0) -> FastAPI:
+    """PayPal REST API stand-in: oauth token, orders, capture, order details and webhook verification"""
+    app = FastAPI()
+    orders: Dict[str, str] = {}
+    ids = itertools.count(1)
+
+    async def delay():
+        if latency:
+            await asyncio.sleep(latency)
+
+    @app.post("/v1/oauth2/token")
+    async def token():
+        await delay()
+        return {"access_token": "loadtest-token", "token_type": "Bearer", "expires_in": 32400}
+
+    @app.post("/v2/checkout/orders", status_code=201)
+    async def create_order(request: Request):
+        await delay()
+        body = await request.json()
+        order_id = f"LT{next(ids):012d}"
+        orders[order_id] = body["purchase_units"][0]["amount"]["value"]
+        return {
+            "id": order_id,
+            "status": "CREATED",
+            "links": [{"rel": "approve", "href": f"https://paypal.local/checkoutnow?token={order_id}"}],
+        }
+
+    @app.post("/v2/checkout/orders/{order_id}/capture", status_code=201)
+    async def capture_order(order_id: str):
+        await delay()
+        amount = orders.get(order_id, "0")
+        return {
+            "id": order_id,
+            "status": "COMPLETED",
+            "purchase_units": [{"payments": {"captures": [
+                {"id": f"CAP-{order_id}", "status": "COMPLETED", "amount": {"currency_code": "USD", "value": amount}}
+            ]}}],
+        }
+
+    @app.get("/v2/checkout/orders/{order_id}")
+    async def order_details(order_id: str):
+        await delay()
+        return {"id": order_id, "status": "APPROVED" if order_id in orders else "CREATED"}
+
+    @app.post("/v1/notifications/verify-webhook-signature")
+    async def verify_webhook_signature():
+        await delay()
+        return {"verification_status": "SUCCESS"}
+
+    return app
+
+
+async def serve_asgi(app, port: int) -> uvicorn.Server:
+    """Start ``app`` on 127.0.0.1:``port`` in this loop; set ``should_exit`` to stop it"""
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="off"))
+    server.task = asyncio.create_task(server.serve())
+    while not server.started:
+        if server.task.done():
+            server.task.result()
+        await asyncio.sleep(0.01)
+    return server
+
+
+class SMTPSink:
+    """Accepts any mail over plain SMTP (no TLS, no auth) and keeps it by recipient"""
+
+    def __init__(self):
+        self.messages: Dict[str, List[Message]] = defaultdict(list)
+        self.received = 0
+        self._arrived = asyncio.Condition()
+        self._server: Optional[asyncio.base_events.Server] = None
+        self._sessions: set = set()
+
+    async def start(self, port: int) -> None:
+        self._server = await asyncio.start_server(self._session, "127.0.0.1", port)
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            for task in self._sessions:
+                task.cancel()
+            await asyncio.gather(*self._sessions, return_exceptions=True)
+            await self._server.wait_closed()
+
+    async def wait_for(self, recipient: str, timeout: float = 10.0) -> Message:
+        """The latest message for ``recipient``, waiting for one to arrive"""
+        async with self._arrived:
+            await asyncio.wait_for(
+                self._arrived.wait_for(lambda: self.messages.get(recipient)),
+                timeout,
+            )
+            return self.messages[recipient][-1]
+
+    async def wait_for_otp(self, recipient: str, timeout: float = 10.0) -> str:
+        message = await self.wait_for(recipient, timeout)
+        match = re.search(r"\b(\d{6})\b", message.get_payload(decode=True).decode())
+        if not match:
+            raise ValueError(f"no OTP in mail to {recipient}")
+        return match.group(1)
+
+    async def _session(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._sessions.add(task)
+        recipients: List[str] = []
+
+        def reply(line: str) -> None:
+            writer.write(f"{line}\r\n".encode())
+
+        reply("220 smtp-sink ready")
+        try:
+            while line := await reader.readline():
+                command = line[:4].upper()
+                if command in (b"HELO", b"EHLO"):
+                    reply("250 smtp-sink")
+                elif command == b"MAIL":
+                    recipients = []
+                    reply("250 OK")
+                elif command == b"RCPT":
+                    recipients.append(line.decode().split(":", 1)[1].strip().strip("<>"))
+                    reply("250 OK")
+                elif command == b"DATA":
+                    reply("354 End data with <CR><LF>.<CR><LF>")
+                    await writer.drain()
+                    data = []
+                    while (chunk := await reader.readline()) not in (b".\r\n", b""):
+                        data.append(chunk[1:] if chunk.startswith(b"..") else chunk)
+                    await self._store(recipients, email.message_from_bytes(b"".join(data)))
+                    reply("250 OK: queued")
+                elif command in (b"RSET", b"NOOP"):
+                    reply("250 OK")
+                elif command == b"QUIT":
+                    reply("221 Bye")
+                    break
+                else:
+                    reply("502 Command not implemented")
+                await writer.drain()
+        finally:
+            self._sessions.discard(task)
+            writer.close()
+
+    async def _store(self, recipients: List[str], message: Message) -> None:
+        async with self._arrived:
+            for recipient in recipients:
+                self.messages[recipient].append(message)
+            self.received += 1
+            self._arrived.notify_all()
@@ -0,0 +1,47 @@
+"""Placeholder settings so the tests can import the app without a .env"""
+import os
+
+import pytest
+
+DEFAULTS = {
+    "DATABASE_URL": "sqlite:///./test.db",
+    "SECRET_KEY": "test-secret",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_TIME": "30",
+    "PAYPAL_MODE": "sandbox",
+    "PAYPAL_CLIENT_ID": "test",
+    "PAYPAL_CLIENT_SECRET": "test",
+    "PAYPAL_API_BASE": "http://127.0.0.1:9",
+    "PAYPAL_WEBHOOK_ID": "WH-TEST",
+    "REDIS_HOST": "127.0.0.1",
+    "REDIS_PORT": "6379",
+    "REDIS_USER": "",
+    "REDIS_PASS": "",
+    "OTP_EXP": "300",
+    "SMTP_HOST": "127.0.0.1",
+    "SMTP_PORT": "2525",
+    "SMTP_USER": "",
+    "SMTP_PASS": "",
+    "FROM_EMAIL": "test@givehub.local",
+    "FRONTEND_URL": "http://localhost:5173",
+}
+
+for key, value in DEFAULTS.items():
+    os.environ.setdefault(key, value)
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    """The real Settings instance; ``settings.set(name, value)`` overrides a field for one test"""
+    from app.core.config import get_settings
+
+    current = get_settings()
+
+    class Overrides:
+        def __getattr__(self, name):
+            return getattr(current, name)
+
+        def set(self, name, value):
+            monkeypatch.setattr(current, name, value)
+
+    return Overrides()
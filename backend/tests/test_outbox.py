@@ -0,0 +1,134 @@
+import asyncio
+from email.message import EmailMessage
+
+import pytest
+from aiosmtpd.controller import Controller
+
+from app.services.outbox import EmailOutbox
+from benchmarks.stubs import free_ports
+
+
+class RecordingHandler:
+    """aiosmtpd handler that keeps delivered mail and can answer DATA with a transient failure"""
+
+    def __init__(self):
+        self.delivered = []
+        self.connections = set()
+        self.refuse = 0  # how many of the next DATA commands get a 451
+
+    async def handle_DATA(self, server, session, envelope):
+        self.connections.add(session.peer)
+        if self.refuse:
+            self.refuse -= 1
+            return "451 4.3.0 Try again later"
+        self.delivered.append(envelope.rcpt_tos[0])
+        return "250 OK"
+
+
+@pytest.fixture
+def smtp(settings):
+    handler = RecordingHandler()
+    port = free_ports(1)[0]
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    settings.set("smtp_host", "127.0.0.1")
+    settings.set("smtp_port", port)
+    settings.set("smtp_user", "")
+    settings.set("smtp_starttls", False)
+    settings.set("smtp_timeout", 5.0)
+    settings.set("email_workers", 1)
+    settings.set("email_retry_backoff", 0.05)
+    yield handler
+    controller.stop()
+
+
+def message(to: str) -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"] = "test@givehub.local"
+    msg["To"] = to
+    msg["Subject"] = "Test"
+    msg.set_content("hello")
+    return msg
+
+
+async def wait_until(condition, timeout: float = 5.0) -> None:
+    async def poll():
+        while not condition():
+            await asyncio.sleep(0.01)
+    await asyncio.wait_for(poll(), timeout)
+
+
+async def test_messages_share_one_pooled_connection(smtp):
+    outbox = EmailOutbox()
+    await outbox.start()
+    try:
+        for i in range(3):
+            outbox.enqueue(message(f"user{i}@example.com"))
+        await wait_until(lambda: len(smtp.delivered) == 3)
+        # a later batch goes out over the same, still open, connection
+        outbox.enqueue(message("user3@example.com"))
+        await wait_until(lambda: len(smtp.delivered) == 4)
+    finally:
+        await outbox.stop()
+
+    assert len(smtp.connections) == 1
+    assert outbox.sent == 4
+
+
+async def test_transient_failure_is_retried(smtp):
+    smtp.refuse = 1
+    outbox = EmailOutbox()
+    await outbox.start()
+    try:
+        outbox.enqueue(message("retry@example.com"))
+        await wait_until(lambda: smtp.delivered == ["retry@example.com"])
+    finally:
+        await outbox.stop()
+
+    assert outbox.failed == 1
+    assert outbox.sent == 1
+    assert not outbox.dead_letters
+
+
+async def test_message_is_dead_lettered_after_max_attempts(smtp, settings):
+    settings.set("email_max_retries", 3)
+    smtp.refuse = 100
+    outbox = EmailOutbox()
+    await outbox.start()
+    try:
+        outbox.enqueue(message("bounce@example.com"))
+        await wait_until(lambda: outbox.dead_letters)
+    finally:
+        await outbox.stop()
+
+    [item] = outbox.dead_letters
+    assert item.attempts == 3
+    assert item.message["To"] == "bounce@example.com"
+    assert "451" in item.last_error
+    assert not smtp.delivered
+
+
+async def test_stop_drains_the_queue(smtp):
+    outbox = EmailOutbox()
+    await outbox.start()
+    for i in range(5):
+        outbox.enqueue(message(f"drain{i}@example.com"))
+    await outbox.stop()
+
+    assert sorted(smtp.delivered) == [f"drain{i}@example.com" for i in range(5)]
+    assert outbox.stats()["queued"] == 0
+
+
+async def test_stop_dead_letters_messages_awaiting_retry(smtp, settings):
+    settings.set("email_retry_backoff", 60.0)
+    smtp.refuse = 1
+    outbox = EmailOutbox()
+    await outbox.start()
+    outbox.enqueue(message("later@example.com"))
+    await wait_until(lambda: outbox.failed == 1)
+    await outbox.stop(timeout=0.1)
+
+    [item] = outbox.dead_letters
+    assert item.message["To"] == "later@example.com"
+    assert item.last_error.startswith("outbox stopped before retry")
+    assert not smtp.delivered
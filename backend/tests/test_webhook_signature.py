@@ -0,0 +1,159 @@
+import base64
+import zlib
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+from cryptography.x509.oid import NameOID
+
+from app.services.paypal_service import paypal_service
+from app.services.webhook_service import CertificateUnavailable, Verification, WebhookService
+
+WEBHOOK_ID = "WH-TEST"
+CERT_URL = "https://api.paypal.com/v1/notifications/certs/CERT-TEST"
+BODY = b'{"id":"WH-1","event_type":"PAYMENT.CAPTURE.COMPLETED","resource":{"id":"CAP-1"}}'
+
+
+def make_cert(valid_from: datetime, valid_to: datetime):
+    """A self-signed signing cert and its key"""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "messageverificationcerts.paypal.com")])
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(valid_from)
+        .not_valid_after(valid_to)
+        .sign(key, hashes.SHA256())
+    )
+    return cert.public_bytes(serialization.Encoding.PEM), key
+
+
+def signed_headers(key, body: bytes, cert_url: str = CERT_URL) -> dict:
+    transmission_id, transmission_time = "TX-1", "2026-10-18T12:00:00Z"
+    message = f"{transmission_id}|{transmission_time}|{WEBHOOK_ID}|{zlib.crc32(body)}"
+    signature = key.sign(message.encode(), padding.PKCS1v15(), hashes.SHA256())
+    return {
+        "paypal-transmission-id": transmission_id,
+        "paypal-transmission-time": transmission_time,
+        "paypal-cert-url": cert_url,
+        "paypal-auth-algo": "SHA256withRSA",
+        "paypal-transmission-sig": base64.b64encode(signature).decode(),
+    }
+
+
+@pytest.fixture
+def cert():
+    now = datetime.now(timezone.utc)
+    return make_cert(now - timedelta(days=1), now + timedelta(days=30))
+
+
+@pytest.fixture
+def paypal(monkeypatch, settings):
+    """Stands in for the PayPal calls; records which ones were made"""
+    settings.set("paypal_webhook_verify_mode", "local")
+
+    class FakePayPal:
+        cert_pem = b""
+        cert_fetches = 0
+        remote_status = 200
+        remote_verdict = "SUCCESS"
+        remote_calls = 0
+
+        async def fetch_cert(self, cert_url):
+            self.cert_fetches += 1
+            return httpx.Response(200, content=self.cert_pem)
+
+        async def verify_webhook_signature(self, verification_data):
+            self.remote_calls += 1
+            return httpx.Response(self.remote_status, json={"verification_status": self.remote_verdict})
+
+    fake = FakePayPal()
+    monkeypatch.setattr(paypal_service, "fetch_cert", fake.fetch_cert)
+    monkeypatch.setattr(paypal_service, "verify_webhook_signature", fake.verify_webhook_signature)
+    return fake
+
+
+async def test_valid_signature_is_verified_locally(paypal, cert):
+    pem, key = cert
+    paypal.cert_pem = pem
+    service = WebhookService()
+
+    assert await service.verify_webhook_signature(WEBHOOK_ID, signed_headers(key, BODY), BODY) is Verification.VALID
+    # the cert is cached: a second delivery doesn't download it again
+    assert await service.verify_webhook_signature(WEBHOOK_ID, signed_headers(key, BODY), BODY) is Verification.VALID
+    assert paypal.cert_fetches == 1
+    assert paypal.remote_calls == 0
+
+
+async def test_tampered_body_is_invalid(paypal, cert):
+    pem, key = cert
+    paypal.cert_pem = pem
+    tampered = BODY.replace(b"CAP-1", b"CAP-2")
+
+    result = await WebhookService().verify_webhook_signature(WEBHOOK_ID, signed_headers(key, BODY), tampered)
+
+    assert result is Verification.INVALID
+    assert paypal.remote_calls == 0
+
+
+async def test_cert_host_outside_allow_list_is_never_fetched(paypal, cert):
+    pem, key = cert
+    paypal.cert_pem = pem
+    paypal.remote_verdict = "FAILURE"
+    headers = signed_headers(key, BODY, cert_url="https://evil.example.com/cert.pem")
+
+    with pytest.raises(CertificateUnavailable):
+        await WebhookService().get_certificate("https://evil.example.com/cert.pem")
+    result = await WebhookService().verify_webhook_signature(WEBHOOK_ID, headers, BODY)
+
+    assert paypal.cert_fetches == 0
+    # no local verdict without a trusted cert; PayPal's answer stands
+    assert paypal.remote_calls == 1
+    assert result is Verification.INVALID
+
+
+async def test_expired_cert_is_not_trusted(paypal):
+    now = datetime.now(timezone.utc)
+    pem, key = make_cert(now - timedelta(days=30), now - timedelta(days=1))
+    paypal.cert_pem = pem
+
+    with pytest.raises(CertificateUnavailable):
+        await WebhookService().get_certificate(CERT_URL)
+    result = await WebhookService().verify_webhook_signature(WEBHOOK_ID, signed_headers(key, BODY), BODY)
+
+    assert paypal.remote_calls == 1
+    assert result is Verification.VALID
+
+
+async def test_falls_back_to_paypal_when_the_cert_cannot_be_downloaded(paypal, cert, monkeypatch):
+    _, key = cert
+
+    async def unreachable(cert_url):
+        raise httpx.ConnectError("connection refused")
+
+    monkeypatch.setattr(paypal_service, "fetch_cert", unreachable)
+
+    result = await WebhookService().verify_webhook_signature(WEBHOOK_ID, signed_headers(key, BODY), BODY)
+
+    assert paypal.remote_calls == 1
+    assert result is Verification.VALID
+
+
+async def test_no_verdict_when_paypal_cannot_verify_either(paypal, cert, monkeypatch):
+    _, key = cert
+    paypal.remote_status = 503
+
+    async def unreachable(cert_url):
+        raise httpx.ConnectError("connection refused")
+
+    monkeypatch.setattr(paypal_service, "fetch_cert", unreachable)
+
+    result = await WebhookService().verify_webhook_signature(WEBHOOK_ID, signed_headers(key, BODY), BODY)
+
+    assert result is Verification.UNAVAILABLE
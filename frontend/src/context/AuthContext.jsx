@@ -79,6 +79,18 @@ export const AuthProvider = ({ children }) => {
     }
   };
 
+  const resendOtp = async (email) => {
+    try {
+      await authService.resendOtp(email);
+      return { success: true, message: TOAST_MESSAGES.RESEND_OTP_SUCCESS };
+    } catch (error) {
+      return {
+        success: false,
+        message: error.response?.data?.detail || TOAST_MESSAGES.RESEND_OTP_ERROR,
+      };
+    }
+  };
+
   const logout = () => {
     authService.logout();
     setToken(null);
@@ -94,6 +106,7 @@ export const AuthProvider = ({ children }) => {
       login,
       register,
       verifyEmail,
+      resendOtp,
       logout
     }}>
       {children}
@@ -10,8 +10,9 @@ import Spinner from '../components/Spinner';
 const EmailVerify = () => {
   const navigate = useNavigate();
   const location = useLocation();
-  const { verifyEmail } = useAuth();
+  const { verifyEmail, resendOtp } = useAuth();
   const [loading, setLoading] = useState(false);
+  const [resending, setResending] = useState(false);
   const [otp, setOtp] = useState('');
   const [error, setError] = useState('');
 
@@ -37,6 +38,18 @@ const EmailVerify = () => {
     }
   };
 
+  const handleResend = async () => {
+    setResending(true);
+    const result = await resendOtp(email);
+    setResending(false);
+
+    if (result.success) {
+      toast.success(result.message);
+    } else {
+      toast.error(result.message);
+    }
+  };
+
   return (
     <div className="min-h-screen bg-gray-50 flex items-center justify-center py-8 px-4">
       <div className="w-full max-w-md">
@@ -72,8 +85,13 @@ const EmailVerify = () => {
           <div className="mt-6 text-center">
             <p className="text-sm text-gray-600">
               Didn't receive the code?{' '}
-              <button className="text-blue-600 hover:text-blue-700 font-semibold">
-                Resend
+              <button
+                type="button"
+                onClick={handleResend}
+                disabled={resending || !email}
+                className="text-blue-600 hover:text-blue-700 font-semibold disabled:opacity-50"
+              >
+                {resending ? 'Sending...' : 'Resend'}
               </button>
             </p>
           </div>
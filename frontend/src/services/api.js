@@ -62,6 +62,11 @@ export const authService = {
     return response.data;
   },
 
+  resendOtp: async (email) => {
+    const response = await api.post('/resend-otp', { email });
+    return response.data;
+  },
+
   getCurrentUser: async () => {
     const response = await api.get('/me');
     return response.data;
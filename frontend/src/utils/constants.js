@@ -3,6 +3,7 @@ export const API_ENDPOINTS = {
   REGISTER: '/register',
   LOGIN: '/login',
   VERIFY_EMAIL: '/verify-email',
+  RESEND_OTP: '/resend-otp',
   
   // Donations
   CREATE_ORDER: '/donations/create-order',
@@ -27,4 +28,6 @@ export const TOAST_MESSAGES = {
   DONATION_ERROR: 'Payment failed. Please try again.',
   VERIFY_EMAIL_SUCCESS: 'Email verified successfully!',
   VERIFY_EMAIL_ERROR: 'Invalid or expired OTP',
+  RESEND_OTP_SUCCESS: 'A new verification code is on its way.',
+  RESEND_OTP_ERROR: 'Could not resend the code. Please try again.',
 };
\ No newline at end of file